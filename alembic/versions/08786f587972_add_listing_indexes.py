@@ -0,0 +1,36 @@
+"""Add indexes for the players and registrations listings
+
+Revision ID: 08786f587972
+Revises: a28840994082
+Create Date: 2026-10-18 16:12:31.904416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '08786f587972'
+down_revision: Union[str, Sequence[str], None] = 'a28840994082'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_players_full_name_id', 'players', ['full_name', 'id'], unique=False)
+    op.create_index(
+        'ix_registrations_sport_season_division_id', 'registrations',
+        ['sport', 'season', 'division', 'id'], unique=False,
+    )
+    op.create_index('ix_registrations_division_id', 'registrations', ['division', 'id'], unique=False)
+    op.create_index('ix_registrations_created_at_id', 'registrations', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_registrations_created_at_id', table_name='registrations')
+    op.drop_index('ix_registrations_division_id', table_name='registrations')
+    op.drop_index('ix_registrations_sport_season_division_id', table_name='registrations')
+    op.drop_index('ix_players_full_name_id', table_name='players')
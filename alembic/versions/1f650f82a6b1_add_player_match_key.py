@@ -0,0 +1,64 @@
+"""Add player match_key and drop the unique full_name constraint
+
+Revision ID: 1f650f82a6b1
+Revises: 91b24c919b59
+Create Date: 2026-10-18 15:04:12.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.identity import match_key
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f650f82a6b1'
+down_revision: Union[str, Sequence[str], None] = '91b24c919b59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('players', sa.Column('match_key', sa.String(), nullable=True))
+
+    # Backfill. Rows that only differed by case or spacing before now share a
+    # key; the later ones get their id appended so they stay distinct until
+    # someone merges them by hand.
+    bind = op.get_bind()
+    players = sa.table(
+        'players',
+        sa.column('id', sa.Integer),
+        sa.column('full_name', sa.String),
+        sa.column('parent_email', sa.String),
+        sa.column('match_key', sa.String),
+    )
+    seen = set()
+    updates = []
+    for player_id, full_name, parent_email in bind.execute(
+        sa.select(players.c.id, players.c.full_name, players.c.parent_email).order_by(players.c.id)
+    ):
+        key = match_key(full_name, parent_email)
+        if key in seen:
+            print(f"⚠️ Player {player_id} ({full_name}) duplicates an earlier player; merge them by hand")
+            key = f"{key}#{player_id}"
+        seen.add(key)
+        updates.append({'player_id': player_id, 'key': key})
+    if updates:
+        bind.execute(
+            players.update().where(players.c.id == sa.bindparam('player_id')).values(match_key=sa.bindparam('key')),
+            updates,
+        )
+
+    op.alter_column('players', 'match_key', existing_type=sa.String(), nullable=False)
+    op.create_index(op.f('ix_players_match_key'), 'players', ['match_key'], unique=True)
+    op.drop_constraint('uq_fullname', 'players', type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint('uq_fullname', 'players', ['full_name'])
+    op.drop_index(op.f('ix_players_match_key'), table_name='players')
+    op.drop_column('players', 'match_key')
@@ -0,0 +1,46 @@
+"""Add inbound_messages table
+
+Revision ID: 91b24c919b59
+Revises: 2fed9797feaa
+Create Date: 2026-10-18 13:22:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91b24c919b59'
+down_revision: Union[str, Sequence[str], None] = '2fed9797feaa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'inbound_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.String(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('order_number', sa.String(), nullable=True),
+        sa.Column('registrant_count', sa.Integer(), nullable=False),
+        sa.Column('duplicate_count', sa.Integer(), nullable=False),
+        sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash'),
+    )
+    op.create_index(op.f('ix_inbound_messages_id'), 'inbound_messages', ['id'], unique=False)
+    op.create_index(op.f('ix_inbound_messages_message_id'), 'inbound_messages', ['message_id'], unique=False)
+    op.create_index(op.f('ix_inbound_messages_order_number'), 'inbound_messages', ['order_number'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_inbound_messages_order_number'), table_name='inbound_messages')
+    op.drop_index(op.f('ix_inbound_messages_message_id'), table_name='inbound_messages')
+    op.drop_index(op.f('ix_inbound_messages_id'), table_name='inbound_messages')
+    op.drop_table('inbound_messages')
@@ -0,0 +1,43 @@
+"""Add jersey_allocations table
+
+Revision ID: 9f8d9627ec58
+Revises: e1161241d801
+Create Date: 2026-10-18 10:03:11.520917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f8d9627ec58'
+down_revision: Union[str, Sequence[str], None] = 'e1161241d801'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'jersey_allocations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('division', sa.String(), nullable=False),
+        sa.Column('season', sa.String(), nullable=False),
+        sa.Column('number', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('division', 'season', 'number', name='uq_jersey_division_season_number'),
+    )
+    op.create_index(op.f('ix_jersey_allocations_id'), 'jersey_allocations', ['id'], unique=False)
+    op.create_index(op.f('ix_jersey_allocations_player_id'), 'jersey_allocations', ['player_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jersey_allocations_player_id'), table_name='jersey_allocations')
+    op.drop_index(op.f('ix_jersey_allocations_id'), table_name='jersey_allocations')
+    op.drop_table('jersey_allocations')
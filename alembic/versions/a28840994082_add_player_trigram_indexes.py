@@ -0,0 +1,41 @@
+"""Add pg_trgm indexes for player search
+
+Revision ID: a28840994082
+Revises: 1f650f82a6b1
+Create Date: 2026-10-18 15:41:55.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a28840994082'
+down_revision: Union[str, Sequence[str], None] = '1f650f82a6b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Other databases search with the in-process index in app.services.search.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_players_full_name_trgm', 'players', ['full_name'],
+        postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_players_parent_email_trgm', 'players', ['parent_email'],
+        postgresql_using='gin', postgresql_ops={'parent_email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_players_parent_email_trgm', table_name='players')
+    op.drop_index('ix_players_full_name_trgm', table_name='players')
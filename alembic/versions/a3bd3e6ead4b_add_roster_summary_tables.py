@@ -0,0 +1,55 @@
+"""Add roster_summary and roster_counters tables
+
+Revision ID: a3bd3e6ead4b
+Revises: 08786f587972
+Create Date: 2026-10-18 16:58:03.771590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3bd3e6ead4b'
+down_revision: Union[str, Sequence[str], None] = '08786f587972'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'roster_summary',
+        sa.Column('sport', sa.String(), nullable=False),
+        sa.Column('season', sa.String(), nullable=False),
+        sa.Column('division', sa.String(), nullable=False),
+        sa.Column('registrations', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('sport', 'season', 'division'),
+    )
+    op.create_table(
+        'roster_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    # Same as `python -m app.manage rebuild-summary`.
+    op.execute(
+        "INSERT INTO roster_summary (sport, season, division, registrations) "
+        "SELECT lower(trim(coalesce(sport, ''))), season, division, count(*) FROM registrations "
+        "GROUP BY lower(trim(coalesce(sport, ''))), season, division"
+    )
+    op.execute(
+        "INSERT INTO roster_counters (name, value) "
+        "SELECT 'players', count(*) FROM players "
+        "UNION ALL SELECT 'missing_emails', count(*) FROM players WHERE parent_email IS NULL OR parent_email = '' "
+        "UNION ALL SELECT 'missing_jerseys', count(*) FROM players WHERE jersey_number IS NULL OR jersey_number = 0"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('roster_counters')
+    op.drop_table('roster_summary')
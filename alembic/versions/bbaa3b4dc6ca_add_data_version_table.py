@@ -0,0 +1,36 @@
+"""Add data_version table
+
+Revision ID: bbaa3b4dc6ca
+Revises: a3bd3e6ead4b
+Create Date: 2026-10-18 17:36:48.160327
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bbaa3b4dc6ca'
+down_revision: Union[str, Sequence[str], None] = 'a3bd3e6ead4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    data_version = op.create_table(
+        'data_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(data_version, [{'id': 1, 'version': 1, 'updated_at': datetime.utcnow()}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('data_version')
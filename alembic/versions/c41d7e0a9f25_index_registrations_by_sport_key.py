@@ -0,0 +1,38 @@
+"""Index registrations by lower(trim(sport))
+
+Revision ID: c41d7e0a9f25
+Revises: bbaa3b4dc6ca
+Create Date: 2026-10-18 19:05:12.418204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e0a9f25'
+down_revision: Union[str, Sequence[str], None] = 'bbaa3b4dc6ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sport filters compare lower(trim(sport)), which the plain column index
+    # could not serve.
+    op.drop_index('ix_registrations_sport_season_division_id', table_name='registrations')
+    op.create_index(
+        'ix_registrations_sport_key_season_division_id', 'registrations',
+        [sa.text('lower(trim(sport))'), 'season', 'division', 'id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_registrations_sport_key_season_division_id', table_name='registrations')
+    op.create_index(
+        'ix_registrations_sport_season_division_id', 'registrations',
+        ['sport', 'season', 'division', 'id'], unique=False,
+    )
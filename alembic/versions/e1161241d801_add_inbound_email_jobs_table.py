@@ -0,0 +1,43 @@
+"""Add inbound_email_jobs table
+
+Revision ID: e1161241d801
+Revises: 067e47789ef7
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1161241d801'
+down_revision: Union[str, Sequence[str], None] = '067e47789ef7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'inbound_email_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('raw_email', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_inbound_email_jobs_id'), 'inbound_email_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_inbound_email_jobs_status'), 'inbound_email_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_inbound_email_jobs_status'), table_name='inbound_email_jobs')
+    op.drop_index(op.f('ix_inbound_email_jobs_id'), table_name='inbound_email_jobs')
+    op.drop_table('inbound_email_jobs')
@@ -1,11 +1,12 @@
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
 
 from .models import User
 
 
 def create_user(db: Session, email: str, password: str) -> User:
     """Create a user with hashed password."""
+    from passlib.hash import bcrypt
+
     user = User(email=email, password_hash=bcrypt.hash(password))
     db.add(user)
     db.commit()
@@ -15,6 +16,8 @@ def create_user(db: Session, email: str, password: str) -> User:
 
 def authenticate_user(db: Session, email: str, password: str) -> User | None:
     """Return user if credentials are valid."""
+    from passlib.hash import bcrypt
+
     user = db.query(User).filter(User.email == email).first()
     if user and bcrypt.verify(password, user.password_hash):
         return user
@@ -1,13 +1,15 @@
-import os
-import re
+import time
 import email
-from bs4 import BeautifulSoup
-from datetime import datetime
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from contextlib import contextmanager
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
 
-from .models import Player, Registration
-from .services.assign import assign_jersey_number
+from .models import InboundMessage, Player, Registration
+from .services.archive import get_archive
+from .services.assign import JerseyAllocator, JerseyPoolExhausted
+from .services.fingerprint import find_duplicate, fingerprint_email, record_duplicate
+from .services.identity import entry_key, resolve_players
+from .services.parser import NAME_RE, HtmlBody, registrant_parser
 
 # Promo code mapping based on number of registrations in a single email
 PROMO_CODES = {
@@ -20,8 +22,6 @@ PROMO_CODES = {
     7: "Pines7Players",
 }
 
-print("📬 Loaded email.py")
-
 # Simplified for local/dev use – no actual email sending, just update flag
 def send_confirmation_email(to_email, player_name, jersey_number, order_url, registration=None, db=None, promo_code=None):
     promo_msg = f" Promo code: {promo_code}" if promo_code else ""
@@ -31,8 +31,12 @@ def send_confirmation_email(to_email, player_name, jersey_number, order_url, reg
         registration.confirmation_sent = True
         db.commit()
 
+
 # Optional: uncomment to send actual emails in production
 # def send_confirmation_email(to_email, player_name, jersey_number, order_url, registration=None, db=None, promo_code=None):
+#     from sendgrid import SendGridAPIClient
+#     from sendgrid.helpers.mail import Mail
+#
 #     html = f"""
 #         <p>Hi {player_name},</p>
 #         <p>Your jersey number is <strong>{jersey_number}</strong>.</p>
@@ -59,24 +63,55 @@ def send_confirmation_email(to_email, player_name, jersey_number, order_url, reg
 #         print(e)
 
 # Utility for capturing raw inbound emails
-def save_inbound_email(email_body: str, filename: str | None = None) -> None:
-    """Persist the raw inbound email to a file for debugging."""
-    root_dir = os.path.dirname(os.path.dirname(__file__))
-    if not filename:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"captured_email_{timestamp}.txt"
-    path = os.path.join(root_dir, filename)
+def save_inbound_email(email_body: str) -> dict | None:
+    """Append the raw inbound email to the archive for debugging and replay."""
     try:
-        with open(path, "w") as f:
-            f.write(email_body)
-        print(f"📩 Saved inbound email to {path}")
+        entry = get_archive().append(email_body)
+        print(f"📩 Archived inbound email #{entry['seq']} in {entry['segment']}")
+        return entry
     except Exception as e:
-        print(f"❌ Failed to save inbound email: {e}")
+        print(f"❌ Failed to archive inbound email: {e}")
+        return None
+
+def process_inbound_email(email_body: str, db) -> bool:
+    """Parse and ingest one raw email. Returns False if it was a resend.
+
+    Resends are recognised from the Message-ID and content hash before any
+    parsing happens. The fingerprint is written in the same transaction as
+    the registrations, so a failed attempt can be retried.
+    """
+    fingerprint = fingerprint_email(email_body)
+    duplicate = find_duplicate(fingerprint, db)
+    if duplicate is not None:
+        print(f"⏭ Skipping duplicate inbound email first seen {duplicate.first_seen_at}")
+        record_duplicate(duplicate, db)
+        return False
 
-def process_inbound_email(email_body: str, db):
     print("📥 Processing inbound email")
+    parsed_regs = parse_inbound_email(email_body)
+    if not fingerprint["order_number"]:
+        fingerprint["order_number"] = next((r["order_number"] for r in parsed_regs if r["order_number"]), None)
+    db.add(InboundMessage(**fingerprint, registrant_count=len(parsed_regs)))
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another worker took the same resend while this one was parsing.
+        db.rollback()
+        print("⏭ Skipping duplicate inbound email processed concurrently")
+        return False
+
+    promo_code = PROMO_CODES.get(len(parsed_regs))
+    ingest_registrations(parsed_regs, db, promo_code=promo_code)
+    if not parsed_regs:
+        db.commit()
+    return True
+
 
-    msg = email.message_from_string(email_body)
+def decode_bodies(msg) -> tuple[str | None, str | None]:
+    """Return the decoded ``(text, html)`` bodies of an email message.
+
+    The HTML body is only looked for when there is no text/plain part.
+    """
     text_content = None
     html_content = None
 
@@ -92,7 +127,6 @@ def process_inbound_email(email_body: str, db):
                 if part.get_content_type() == "text/html":
                     charset = part.get_content_charset() or "utf-8"
                     html_content = part.get_payload(decode=True).decode(charset, errors="replace")
-                    text_content = BeautifulSoup(html_content, "html.parser").get_text()
                     break
     else:
         if msg.get_content_type() == "text/plain":
@@ -101,193 +135,124 @@ def process_inbound_email(email_body: str, db):
         elif msg.get_content_type() == "text/html":
             charset = msg.get_content_charset() or "utf-8"
             html_content = msg.get_payload(decode=True).decode(charset, errors="replace")
-            text_content = BeautifulSoup(html_content, "html.parser").get_text()
 
-    if text_content is None or not re.search(r"Name:\s*", text_content, re.IGNORECASE):
+    return text_content, html_content
+
+
+@contextmanager
+def _stage(timings: dict | None, name: str):
+    """Add the time spent in the block to ``timings[name]`` when collecting."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def parse_inbound_email(email_body: str, timings: dict | None = None) -> list[dict]:
+    """Extract registrations from a raw inbound email without touching the DB.
+
+    If ``timings`` is a dict, seconds spent in the ``mime``, ``html`` and
+    ``extract`` stages are added to it.
+    """
+    with _stage(timings, "mime"):
+        msg = email.message_from_string(email_body)
+        text_content, html_content = decode_bodies(msg)
+
+    html_body = None
+    if text_content is None and html_content is not None:
+        with _stage(timings, "html"):
+            html_body = HtmlBody(html_content)
+            text_content = html_body.text()
+
+    if text_content is None or not NAME_RE.search(text_content):
         text_content = email_body
 
-    # Clean up formatting issues
-    text_content = text_content.replace("\r\n", "\n").replace("=\n", "").strip()
+    with _stage(timings, "extract"):
+        parsed_regs = registrant_parser.parse_text(text_content)
 
-    lines = text_content.splitlines()
+    if not parsed_regs and html_body is not None:
+        with _stage(timings, "html"):
+            try:
+                parsed_regs = registrant_parser.parse_order_table(html_body, msg.get("To"))
+            except Exception as e:
+                print(f"❌ Error parsing order details table: {e}")
 
-    # Split by lines and chunk into blocks per registrant
-    registrant_blocks = []
-    current_block = []
+    return parsed_regs
 
-    for line in lines:
-        if line.strip() == "":
-            if current_block:
-                registrant_blocks.append(current_block)
-                current_block = []
-        else:
-            current_block.append(line)
-
-    if current_block:
-        registrant_blocks.append(current_block)
-
-    parsed_regs = []
-
-    for block in registrant_blocks:
-        full_text = "\n".join(block)
-
-        # Skip adult leagues and camps
-        if "Adult League Softball" in full_text or "Camp" in full_text:
-            print("⏭ Skipping non-youth program")
-            continue
-
-        try:
-            name_match = re.search(r"Name:\s*(.+)", full_text, re.IGNORECASE)
-            program_match = re.search(r"Program:\s*(.+)", full_text, re.IGNORECASE)
-            division_match = re.search(r"Division:\s*(.+)", full_text, re.IGNORECASE)
-            parent_email_match = re.search(r"Parent Email:\s*(.+)", full_text, re.IGNORECASE)
-            order_number_match = re.search(r"Order Number:\s*(.+)", full_text, re.IGNORECASE)
-            order_date_match = re.search(r"Order Date:\s*(.+)", full_text, re.IGNORECASE)
-
-            missing = [key for key, match in {
-                "Name": name_match,
-                "Program": program_match,
-                "Division": division_match,
-                "Parent Email": parent_email_match,
-            }.items() if not match]
-
-            if missing:
-                print(f"❌ Skipping entry, missing: {', '.join(missing)}")
-                continue
-
-            full_name = name_match.group(1).strip()
-            program = program_match.group(1).strip()
-            division = division_match.group(1).strip()
-            parent_email = parent_email_match.group(1).strip()
-            order_number = order_number_match.group(1).strip() if order_number_match else None
-            order_date = datetime.strptime(order_date_match.group(1).strip(), "%B %d, %Y") if order_date_match else None
-
-            sport = "unknown"
-            season = "unknown"
-
-            parts = program.lower().split()
-            if "fall" in parts:
-                season = "fall"
-            elif "spring" in parts:
-                season = "spring"
-            elif "summer" in parts:
-                season = "summer"
-            elif "winter" in parts:
-                season = "winter"
-
-            for s in ["soccer", "basketball", "baseball", "softball", "volleyball", "flag"]:
-                if s in parts:
-                    sport = s
-                    break
 
-            parsed_regs.append({
-                "full_name": full_name,
-                "program": program,
-                "division": division,
-                "parent_email": parent_email,
-                "order_number": order_number,
-                "order_date": order_date,
-                "sport": sport,
-                "season": season,
-            })
-
-        except Exception as e:
-            print(f"❌ Error processing registrant block: {e}")
-
-    if not parsed_regs and html_content:
-        try:
-            soup = BeautifulSoup(html_content, "html.parser")
-            order_table = None
-            for table in soup.find_all("table"):
-                if table.find(string=re.compile("Order Details", re.IGNORECASE)):
-                    order_table = table
-                    break
+# Registration fields an inbound email may change on an existing registration.
+_UPDATE_FIELDS = ["division", "program", "order_number", "order_date"]
 
-            if order_table:
-                order_number = None
-                order_date = None
-
-                for row in order_table.find_all("tr"):
-                    cells = row.find_all(["td", "th"])
-                    if len(cells) < 2:
-                        continue
-                    header = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
-                    if re.search("Order Number", header, re.IGNORECASE):
-                        order_number = value
-                    elif re.search("Order Date", header, re.IGNORECASE):
-                        try:
-                            order_date = datetime.strptime(value, "%B %d, %Y")
-                        except Exception:
-                            order_date = None
-
-                for row in order_table.find_all("tr"):
-                    spans = row.find_all("span")
-                    if len(spans) >= 2:
-                        full_name = spans[0].get_text(strip=True)
-                        prog_div = spans[1].get_text(strip=True)
-                        if " - " in prog_div:
-                            program, division = [p.strip() for p in prog_div.split(" - ", 1)]
-                        else:
-                            program = prog_div.strip()
-                            division = ""
-                        parent_email = msg.get("To")
-
-                        sport = "unknown"
-                        season = "unknown"
-                        parts = program.lower().split()
-                        if "fall" in parts:
-                            season = "fall"
-                        elif "spring" in parts:
-                            season = "spring"
-                        elif "summer" in parts:
-                            season = "summer"
-                        elif "winter" in parts:
-                            season = "winter"
-
-                        for s in ["soccer", "basketball", "baseball", "softball", "volleyball", "flag"]:
-                            if s in parts:
-                                sport = s
-                                break
-
-                        parsed_regs.append({
-                            "full_name": full_name,
-                            "program": program,
-                            "division": division,
-                            "parent_email": parent_email,
-                            "order_number": order_number,
-                            "order_date": order_date,
-                            "sport": sport,
-                            "season": season,
-                        })
-        except Exception as e:
-            print(f"❌ Error parsing order details table: {e}")
 
-    promo_code = PROMO_CODES.get(len(parsed_regs))
+def ingest_registrations(parsed_regs, db, promo_code=None, candidates=None):
+    """Write parsed registrations for one email in a single transaction.
+
+    Players are resolved by match key and existing registrations loaded
+    with one query each, and jersey numbers for new players are handed out
+    per division in one pass. With a ``CandidateIndex`` as ``candidates``,
+    new players that look like an existing one are reported.
+    """
+    if not parsed_regs:
+        return
 
+    players = resolve_players(db, {entry_key(entry) for entry in parsed_regs})
+
+    existing_regs = {}
+    if players:
+        regs = db.query(Registration).filter(
+            Registration.player_id.in_([player.id for player in players.values()])
+        )
+        keys_by_id = {player.id: key for key, player in players.items()}
+        for reg in regs:
+            existing_regs[(keys_by_id[reg.player_id], reg.sport, reg.season)] = reg
+
+    new_entries = {}
     for entry in parsed_regs:
-        player = db.query(Player).filter_by(full_name=entry["full_name"]).first()
-
-        if not player:
-            jersey_number = assign_jersey_number(db, entry["division"])
-            player = Player(
-                full_name=entry["full_name"],
-                parent_email=entry["parent_email"],
-                jersey_number=jersey_number,
-            )
-            db.add(player)
-            db.commit()
-            db.refresh(player)
+        key = entry_key(entry)
+        if key not in players:
+            new_entries.setdefault(key, entry)
+
+    if new_entries:
+        for key, entry in new_entries.items():
+            if candidates is not None:
+                for other in candidates.near_duplicates(entry["full_name"], entry["parent_email"]):
+                    print(f"⚠️ New player {entry['full_name']} <{entry['parent_email']}> may be the same as {other}")
+                candidates.add(entry["full_name"], entry["parent_email"])
+            players[key] = Player(full_name=entry["full_name"], parent_email=entry["parent_email"])
+            db.add(players[key])
+        db.flush()
+
+        # New players get a number in the division and season of the first
+        # registration they appear with in this email.
+        allocator = JerseyAllocator(db)
+        divisions_by_season = defaultdict(set)
+        for entry in new_entries.values():
+            divisions_by_season[entry["season"]].add(entry["division"])
+        for season, divisions in divisions_by_season.items():
+            allocator.load(divisions, season)
+        for key, entry in new_entries.items():
+            player = players[key]
+            try:
+                player.jersey_number = allocator.allocate(
+                    entry["division"], season=entry["season"], player_ids=[player.id]
+                )[0]
+            except JerseyPoolExhausted as e:
+                print(f"⚠️ {e}; {entry['full_name']} needs a jersey number assigned by hand")
 
-        existing_reg = db.query(Registration).filter_by(
-            player_id=player.id,
-            sport=entry["sport"],
-            season=entry["season"],
-        ).first()
+    for entry in parsed_regs:
+        key = entry_key(entry)
+        player = players[key]
+
+        reg_key = (key, entry["sport"], entry["season"])
+        existing_reg = existing_regs.get(reg_key)
 
         if not existing_reg:
             reg = Registration(
-                player_id=player.id,
+                player=player,
                 program=entry["program"],
                 division=entry["division"],
                 sport=entry["sport"],
@@ -297,7 +262,7 @@ def process_inbound_email(email_body: str, db):
                 confirmation_sent=False,
             )
             db.add(reg)
-            db.commit()
+            existing_regs[reg_key] = reg
 
             # Auto email sending disabled. Uncomment to enable.
             # send_confirmation_email(
@@ -310,11 +275,12 @@ def process_inbound_email(email_body: str, db):
             #     promo_code=promo_code,
             # )
         else:
-            existing_reg.division = entry["division"]
-            existing_reg.program = entry["program"]
-            existing_reg.order_number = entry["order_number"]
-            existing_reg.order_date = entry["order_date"]
-            db.commit()
-            print(
-                f"✔ Updated registration for {player.full_name} to {entry['division']} in {entry['sport']} {entry['season']}"
-            )
+            changed = [field for field in _UPDATE_FIELDS if getattr(existing_reg, field) != entry[field]]
+            for field in changed:
+                setattr(existing_reg, field, entry[field])
+            if changed:
+                print(
+                    f"✔ Updated {', '.join(changed)} for {player.full_name} in {entry['sport']} {entry['season']}"
+                )
+
+    db.commit()
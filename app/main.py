@@ -1,36 +1,83 @@
-from fastapi import FastAPI, Depends, Request, Form, status, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from .database import Base, engine, SessionLocal
-from .models import Player, Registration, User
-from .auth import authenticate_user, create_user
-from .services.assign import assign_jersey_number
-from .email import send_confirmation_email, process_inbound_email, save_inbound_email
+from . import startup
+
+with startup.phase("import framework"):
+    from fastapi import FastAPI, Depends, File, Query, Request, Form, UploadFile, status, HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse, Response
+    from fastapi.templating import Jinja2Templates
+    from starlette.middleware.sessions import SessionMiddleware
+    from sqlalchemy import func, or_
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+    from pydantic import BaseModel
+
+with startup.phase("import app"):
+    from .database import (
+        READ_YOUR_WRITES_SECONDS,
+        ReadSessionLocal,
+        SessionLocal,
+        get_async_sessionmaker,
+    )
+    from .models import Player, Registration, User, InboundEmailJob
+    from .auth import authenticate_user, create_user
+    from .metrics import MetricsMiddleware, render_metrics
+    from .services.assign import JerseyNumberTaken, JerseyPoolExhausted, assign_jersey_number, change_jersey_number
+    from .services.export import csv_chunks, export_rows, gzip_chunks
+    from .services.email_queue import EmailWorkerPool, enqueue_inbound_email
+    from .services.fingerprint import find_duplicate, fingerprint_email, record_duplicate
+    from .services.outbox import OutboxSender, queue_confirmations
+    from .services.roster_import import ImportHeaderError, import_roster
+    from .services.listing import ListingError, list_players, list_registrations
+    from .services.search import search_players
+    from .services.summary import dashboard_counts
+    from .services import data_version
+    from .email import save_inbound_email
 from collections import defaultdict
-import csv
-import io
 import os
+import time
 
 app = FastAPI()
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SECRET_KEY", "secret-key"))
+app.add_middleware(MetricsMiddleware)
 templates = Jinja2Templates(directory="app/templates")
-Base.metadata.create_all(bind=engine)
+DIVISION_ORDER = {"U4": 0, "U6": 1, "U8": 2, "U10": 3, "U12": 4, "U14": 5}
+email_workers = EmailWorkerPool(SessionLocal, int(os.getenv("EMAIL_WORKERS", "2")))
+email_sender = OutboxSender(SessionLocal)
 
 
 @app.on_event("startup")
-def ensure_admin_user() -> None:
-    """Create initial admin user if none exist."""
-    db = SessionLocal()
-    try:
-        if not db.query(User).first():
-            email = os.getenv("ADMIN_EMAIL", "admin@example.com")
-            password = os.getenv("ADMIN_PASSWORD", "admin")
-            create_user(db, email, password)
-    finally:
-        db.close()
+def start_email_workers() -> None:
+    """Start background workers that drain the inbound email queue."""
+    with startup.phase("start email workers"):
+        email_workers.start()
+
+
+@app.on_event("startup")
+def start_email_sender() -> None:
+    """Start background senders that drain the confirmation email outbox."""
+    with startup.phase("start email sender"):
+        email_sender.start()
+
+
+@app.on_event("startup")
+def report_startup() -> None:
+    print(startup.report())
+
+
+@app.on_event("shutdown")
+def stop_email_workers() -> None:
+    email_workers.stop()
+    email_sender.stop()
+
+@app.exception_handler(data_version.NotModified)
+def not_modified(request: Request, exc: data_version.NotModified):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=exc.headers)
+
+
+@app.exception_handler(JerseyPoolExhausted)
+def jersey_pool_exhausted(request: Request, exc: JerseyPoolExhausted):
+    return JSONResponse({"detail": str(exc)}, status_code=status.HTTP_409_CONFLICT)
 
 def get_db():
     db = SessionLocal()
@@ -40,6 +87,38 @@ def get_db():
         db.close()
 
 
+def mark_primary_reads(request: Request) -> None:
+    """Send this user's reads to the primary for a while after they write.
+
+    The replica may lag behind, and a coach who just edited a player expects
+    to see the change on the next page load.
+    """
+    request.session["primary_reads_until"] = time.time() + READ_YOUR_WRITES_SECONDS
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """Session for read-only routes: the replica when one is configured.
+
+    Falls back to the primary session (which has not connected yet and
+    costs nothing unused) when there is no replica or the user wrote
+    recently.
+    """
+    if ReadSessionLocal is None or request.session.get("primary_reads_until", 0) > time.time():
+        yield db
+        return
+    replica = ReadSessionLocal()
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+async def get_async_db():
+    """Async session for ``async def`` routes, so queries never block the event loop."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
 def require_login(request: Request):
     """Redirect to login if user not authenticated."""
     if not request.session.get("user_id"):
@@ -50,16 +129,22 @@ def read_root():
     return {"message": "POSA Jersey App is running!"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request latency and per-request SQL stats in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/login", response_class=HTMLResponse)
 def login_form(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request, "error": None})
+    return templates.TemplateResponse(request, "login.html", {"error": None})
 
 
 @app.post("/login")
 def login(request: Request, email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
     user = authenticate_user(db, email, password)
     if not user:
-        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"}, status_code=400)
+        return templates.TemplateResponse(request, "login.html", {"error": "Invalid credentials"}, status_code=400)
     request.session["user_id"] = user.id
     return RedirectResponse("/admin", status_code=302)
 
@@ -76,7 +161,7 @@ def invite_form(request: Request):
         require_login(request)
     except HTTPException as exc:
         return RedirectResponse(exc.headers["Location"], status_code=exc.status_code)
-    return templates.TemplateResponse("invite_user.html", {"request": request, "error": None})
+    return templates.TemplateResponse(request, "invite_user.html", {"error": None})
 
 
 @app.post("/invite")
@@ -86,53 +171,64 @@ def invite_user(request: Request, email: str = Form(...), password: str = Form(.
     except HTTPException as exc:
         return RedirectResponse(exc.headers["Location"], status_code=exc.status_code)
     if db.query(User).filter(User.email == email).first():
-        return templates.TemplateResponse("invite_user.html", {"request": request, "error": "User already exists"}, status_code=400)
+        return templates.TemplateResponse(request, "invite_user.html", {"error": "User already exists"}, status_code=400)
     create_user(db, email, password)
     return RedirectResponse("/admin", status_code=302)
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin_dashboard(request: Request, db: Session = Depends(get_db)):
+def admin_dashboard(request: Request, db: Session = Depends(get_read_db)):
     try:
         require_login(request)
     except HTTPException as exc:
         return RedirectResponse(exc.headers["Location"], status_code=exc.status_code)
-    players = db.query(Player).all()
-    division_order = {"U4": 0, "U6": 1, "U8": 2, "U10": 3, "U12": 4, "U14": 5}
-    players_by_sport = defaultdict(lambda: defaultdict(list))
-    missing_emails = 0
-    missing_jerseys = 0
-
-    for player in players:
-        if not player.parent_email:
-            missing_emails += 1
-        if not player.jersey_number:
-            missing_jerseys += 1
-
-        for reg in player.registrations:
-            sport_key = (reg.sport or "").strip().lower()
-            players_by_sport[sport_key][reg.division].append({
-                "id": player.id,
-                "registration_id": reg.id,
-                "full_name": player.full_name,
-                "parent_email": player.parent_email,
-                "jersey_number": player.jersey_number,
-                "sport": sport_key,
-                "division": reg.division,
-                "confirmation_sent": reg.confirmation_sent,
-            })
+    cache_headers = data_version.check(request.headers, db)
+    counters, pairs = dashboard_counts(db)
+
+    divisions_by_sport = defaultdict(set)
+    for sport, division in pairs:
+        divisions_by_sport[sport].add(division)
+
+    sorted_divisions_by_sport = {
+        sport: sorted(divisions, key=lambda d: DIVISION_ORDER.get(d, 999))
+        for sport, divisions in divisions_by_sport.items()
+    }
 
-    sorted_players_by_sport = {}
-    for sport, divisions in players_by_sport.items():
-        sorted_divisions = dict(sorted(divisions.items(), key=lambda x: division_order.get(x[0], 999)))
-        sorted_players_by_sport[sport] = sorted_divisions
+    return templates.TemplateResponse(request, "admin.html", {
+        "divisions_by_sport": sorted_divisions_by_sport,
+        "total_players": counters["players"],
+        "missing_emails": counters["missing_emails"],
+        "missing_jerseys": counters["missing_jerseys"],
+    }, headers=cache_headers)
 
-    return templates.TemplateResponse("admin.html", {
-        "request": request,
-        "players_by_sport": sorted_players_by_sport,
-        "total_players": len(players),
-        "missing_emails": missing_emails,
-        "missing_jerseys": missing_jerseys,
-    })
+
+@app.get("/admin/roster/{sport}/{division:path}", response_class=HTMLResponse)
+def admin_roster(sport: str, division: str, request: Request, db: Session = Depends(get_read_db)):
+    """Render the roster table for one sport and division of the dashboard."""
+    require_login(request)
+    cache_headers = data_version.check(request.headers, db)
+    sport_key = sport.strip().lower()
+    rows = (
+        db.query(
+            Player.id,
+            Player.full_name,
+            Player.parent_email,
+            Player.jersey_number,
+            Registration.id.label("registration_id"),
+            Registration.confirmation_sent,
+        )
+        .join(Registration, Registration.player_id == Player.id)
+        .filter(
+            func.lower(func.trim(Registration.sport)) == sport_key,
+            Registration.division == division,
+        )
+        .order_by(Player.id, Registration.id)
+        .all()
+    )
+    return templates.TemplateResponse(request, "roster_table.html", {
+        "sport": sport_key,
+        "division": division,
+        "players": rows,
+    }, headers=cache_headers)
 
 
 @app.get("/players/new", response_class=HTMLResponse)
@@ -142,7 +238,7 @@ def new_player_form(request: Request):
         require_login(request)
     except HTTPException as exc:
         return RedirectResponse(exc.headers["Location"], status_code=exc.status_code)
-    return templates.TemplateResponse("new_player.html", {"request": request})
+    return templates.TemplateResponse(request, "new_player.html")
 
 
 @app.post("/players/new")
@@ -157,11 +253,11 @@ def create_player_manual(
 ):
     """Create player and registration from form submission."""
     require_login(request)
-    jersey_number = assign_jersey_number(db, division)
     sport_normalized = sport.strip().lower()
-    player = Player(full_name=full_name, parent_email=parent_email, jersey_number=jersey_number)
+    player = Player(full_name=full_name, parent_email=parent_email)
     db.add(player)
     db.flush()
+    player.jersey_number = assign_jersey_number(db, division, season=season, player_id=player.id)
     reg = Registration(
         player_id=player.id,
         program=f"{season} {sport}",
@@ -171,6 +267,7 @@ def create_player_manual(
     )
     db.add(reg)
     db.commit()
+    mark_primary_reads(request)
     return RedirectResponse("/admin", status_code=302)
 
 class PlayerUpdate(BaseModel):
@@ -179,15 +276,24 @@ class PlayerUpdate(BaseModel):
     jersey_number: int
 
 @app.put("/players/{player_id}")
-async def update_player(player_id: int, player: PlayerUpdate, request: Request, db: Session = Depends(get_db)):
+async def update_player(player_id: int, player: PlayerUpdate, request: Request, db: AsyncSession = Depends(get_async_db)):
     require_login(request)
-    db_player = db.query(Player).get(player_id)
+    db_player = await db.get(Player, player_id)
     if db_player:
+        try:
+            await db.run_sync(change_jersey_number, db_player, player.jersey_number)
+        except JerseyNumberTaken as exc:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=str(exc))
         db_player.full_name = player.full_name
         db_player.parent_email = player.parent_email
-        db_player.jersey_number = player.jersey_number
-        db.commit()
-        db.refresh(db_player)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Another player already has this name and parent email")
+        await db.refresh(db_player)
+        mark_primary_reads(request)
         return db_player
     else:
         raise HTTPException(status_code=404, detail="Player not found")
@@ -205,29 +311,31 @@ class InlinePlayerCreate(PlayerCreate):
 def create_player(player: PlayerCreate, request: Request, db: Session = Depends(get_db)):
     require_login(request)
     dummy_division = "U6"
-    jersey_number = assign_jersey_number(db, dummy_division)
     db_player = Player(
         full_name=player.full_name,
         parent_email=player.parent_email,
-        jersey_number=jersey_number
     )
     db.add(db_player)
+    db.flush()
+    db_player.jersey_number = assign_jersey_number(db, dummy_division, player_id=db_player.id)
     db.commit()
     db.refresh(db_player)
+    mark_primary_reads(request)
     return db_player
 
 
 @app.post("/players/inline")
 def create_player_inline(player: InlinePlayerCreate, request: Request, db: Session = Depends(get_db)):
     require_login(request)
-    jersey_number = assign_jersey_number(db, player.division)
     db_player = Player(
         full_name=player.full_name,
         parent_email=player.parent_email,
-        jersey_number=jersey_number,
     )
     db.add(db_player)
     db.flush()
+    db_player.jersey_number = assign_jersey_number(
+        db, player.division, season=player.season, player_id=db_player.id
+    )
     reg = Registration(
         player_id=db_player.id,
         program=f"{player.season} {player.sport}",
@@ -237,6 +345,7 @@ def create_player_inline(player: InlinePlayerCreate, request: Request, db: Sessi
     )
     db.add(reg)
     db.commit()
+    mark_primary_reads(request)
     return {
         "id": db_player.id,
         "registration_id": reg.id,
@@ -248,17 +357,125 @@ def create_player_inline(player: InlinePlayerCreate, request: Request, db: Sessi
         "confirmation_sent": reg.confirmation_sent,
     }
 
+@app.get("/players")
+def list_players_endpoint(
+    request: Request,
+    response: Response,
+    sport: str | None = None,
+    season: str | None = None,
+    division: str | None = None,
+    confirmation_sent: bool | None = None,
+    missing_email: bool = False,
+    missing_jersey: bool = False,
+    sort: str = "id",
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+):
+    """Players matching the filters, one keyset page at a time."""
+    require_login(request)
+    response.headers.update(data_version.check(request.headers, db))
+    try:
+        rows, next_cursor, has_more = list_players(
+            db, sport=sport, season=season, division=division, confirmation_sent=confirmation_sent,
+            missing_email=missing_email, missing_jersey=missing_jersey, sort=sort, cursor=cursor, limit=limit,
+        )
+    except ListingError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": [dict(row._mapping) for row in rows], "next_cursor": next_cursor, "has_more": has_more}
+
+
+@app.get("/registrations")
+def list_registrations_endpoint(
+    request: Request,
+    response: Response,
+    sport: str | None = None,
+    season: str | None = None,
+    division: str | None = None,
+    confirmation_sent: bool | None = None,
+    missing_email: bool = False,
+    missing_jersey: bool = False,
+    sort: str = "id",
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+):
+    """Registrations with their player, filtered and keyset-paginated."""
+    require_login(request)
+    response.headers.update(data_version.check(request.headers, db))
+    try:
+        rows, next_cursor, has_more = list_registrations(
+            db, sport=sport, season=season, division=division, confirmation_sent=confirmation_sent,
+            missing_email=missing_email, missing_jersey=missing_jersey, sort=sort, cursor=cursor, limit=limit,
+        )
+    except ListingError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": [dict(row._mapping) for row in rows], "next_cursor": next_cursor, "has_more": has_more}
+
+
+@app.get("/players/search")
+def search_players_endpoint(
+    request: Request,
+    response: Response,
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """Fuzzy search players by name or parent email, best match first."""
+    require_login(request)
+    response.headers.update(data_version.check(request.headers, db))
+    results, has_more = search_players(db, q, limit=limit, offset=offset)
+    return {
+        "query": q,
+        "results": [
+            {
+                "id": player.id,
+                "full_name": player.full_name,
+                "parent_email": player.parent_email,
+                "jersey_number": player.jersey_number,
+                "score": round(score, 3),
+            }
+            for player, score in results
+        ],
+        "next_offset": offset + limit if has_more else None,
+    }
+
 @app.get("/export")
-def export_players_csv(request: Request, db: Session = Depends(get_db)):
+def export_players_csv(
+    request: Request,
+    sport: str | None = None,
+    season: str | None = None,
+    division: str | None = None,
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    require_login(request)
+    cache_headers = data_version.check(request.headers, db)
+    chunks = csv_chunks(export_rows(db, sport=sport, season=season, division=division))
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={**cache_headers, "Content-Disposition": 'attachment; filename="players.csv.gz"'},
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv",
+        headers={**cache_headers, "Content-Disposition": 'attachment; filename="players.csv"'},
+    )
+
+@app.post("/roster/import")
+def import_roster_csv(request: Request, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Import players and registrations from an uploaded roster CSV."""
     require_login(request)
-    players = db.query(Player).all()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Name", "Parent Email", "Jersey Number"])
-    for player in players:
-        writer.writerow([player.full_name, player.parent_email, player.jersey_number])
-    output.seek(0)
-    return StreamingResponse(io.BytesIO(output.getvalue().encode()), media_type="text/csv")
+    try:
+        report = import_roster(file.file, db)
+    except ImportHeaderError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    print(f"📥 Imported {report['imported']} registrations from {file.filename}, {len(report['errors'])} rows rejected")
+    mark_primary_reads(request)
+    return report
 
 @app.delete("/players/{player_id}")
 def delete_player(player_id: int, request: Request, db: Session = Depends(get_db)):
@@ -267,36 +484,88 @@ def delete_player(player_id: int, request: Request, db: Session = Depends(get_db
     if player:
         db.delete(player)
         db.commit()
+        mark_primary_reads(request)
         return {"message": "Player deleted"}
     else:
         raise HTTPException(status_code=404, detail="Player not found")
 
 @app.post("/email/receive")
-async def receive_email(request: Request, db: Session = Depends(get_db)):
+async def receive_email(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     form = await request.form()
     raw_email = form.get("email")
 
     if raw_email:
-        save_inbound_email(raw_email)
-        process_inbound_email(raw_email, db)
-        return {"message": "Email received and processed"}
+        # Webhook resends of an email we already processed are dropped here.
+        fingerprint = fingerprint_email(raw_email)
+        duplicate = await db.run_sync(lambda session: find_duplicate(fingerprint, session))
+        if duplicate is not None:
+            await db.run_sync(lambda session: record_duplicate(duplicate, session))
+            return {"message": "Duplicate email ignored", "duplicate": True}
+        await run_in_threadpool(save_inbound_email, raw_email)
+        job = await db.run_sync(lambda session: enqueue_inbound_email(raw_email, session))
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Email queued for processing", "job_id": job.id}
     else:
         return {"error": "No email content found in request"}
 
 
+@app.get("/email/jobs/{job_id}")
+def get_email_job(job_id: int, request: Request, db: Session = Depends(get_db)):
+    require_login(request)
+    job = db.get(InboundEmailJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+class BulkSendRequest(BaseModel):
+    sport: str | None = None
+    season: str | None = None
+    division: str | None = None
+    registration_ids: list[int] | None = None
+    resend: bool = False
+
+
+@app.post("/registrations/send_bulk")
+def send_bulk_registration_emails(payload: BulkSendRequest, request: Request, db: Session = Depends(get_db)):
+    """Queue confirmations for a division (or explicit registration IDs) at once."""
+    require_login(request)
+    query = db.query(Registration)
+    if payload.registration_ids is not None:
+        query = query.filter(Registration.id.in_(payload.registration_ids))
+    elif payload.sport and payload.season and payload.division:
+        query = query.filter(
+            func.lower(func.trim(Registration.sport)) == payload.sport.strip().lower(),
+            Registration.season == payload.season,
+            Registration.division == payload.division,
+        )
+    else:
+        raise HTTPException(status_code=400, detail="Provide sport, season and division, or registration_ids")
+    if not payload.resend:
+        query = query.filter(or_(Registration.confirmation_sent.is_(False), Registration.confirmation_sent.is_(None)))
+
+    queued = queue_confirmations(query, db)
+    return JSONResponse(
+        {"message": f"Queued {queued} emails", "queued": queued},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
 @app.post("/registrations/{registration_id}/send_email")
 def send_registration_email(registration_id: int, request: Request, db: Session = Depends(get_db)):
     require_login(request)
     reg = db.query(Registration).get(registration_id)
     if not reg:
         raise HTTPException(status_code=404, detail="Registration not found")
-    player = reg.player
-    send_confirmation_email(
-        player.parent_email,
-        player.full_name,
-        player.jersey_number,
-        "https://your-order-url.com",
-        reg,
-        db,
+    queued = queue_confirmations(db.query(Registration).filter(Registration.id == registration_id), db)
+    return JSONResponse(
+        {"message": "Email queued", "queued": queued},
+        status_code=status.HTTP_202_ACCEPTED,
     )
-    return {"message": "Email sent"}
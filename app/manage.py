@@ -0,0 +1,97 @@
+"""Administrative commands that used to run on every app start.
+
+    python -m app.manage init-db
+    python -m app.manage create-admin --email admin@posasports.org --password secret
+    python -m app.manage rebuild-summary
+"""
+import argparse
+import os
+import sys
+
+from .auth import create_user
+from .database import Base, DATABASE_URL, SessionLocal, engine
+from .models import User
+from .services import summary
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def init_db() -> None:
+    """Create any missing tables and the first admin user.
+
+    The original tables predate the Alembic history, so a fresh database is
+    built from the models and then stamped at the latest revision. Existing
+    databases should be upgraded with ``alembic upgrade head`` instead.
+    """
+    Base.metadata.create_all(bind=engine)
+    print("✅ Tables created")
+    try:
+        from alembic import command
+        from alembic.config import Config
+    except ImportError:
+        print("ℹ️ Alembic is not installed; run `alembic stamp head` before the next upgrade")
+    else:
+        config = Config(ALEMBIC_INI)
+        config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+        command.stamp(config, "head")
+        print("✅ Stamped database at the latest migration")
+    ensure_admin_user()
+
+
+def ensure_admin_user() -> None:
+    """Create the initial admin user if no users exist."""
+    db = SessionLocal()
+    try:
+        if db.query(User).first():
+            print("ℹ️ Users already exist, no admin created")
+            return
+        email = os.getenv("ADMIN_EMAIL", "admin@example.com")
+        create_user(db, email, os.getenv("ADMIN_PASSWORD", "admin"))
+        print(f"✅ Created admin user {email}")
+    finally:
+        db.close()
+
+
+def create_admin(email: str, password: str) -> None:
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.email == email).first():
+            print(f"❌ User {email} already exists")
+            return
+        create_user(db, email, password)
+        print(f"✅ Created user {email}")
+    finally:
+        db.close()
+
+
+def rebuild_summary() -> None:
+    """Recompute the dashboard counters from the players and registrations."""
+    db = SessionLocal()
+    try:
+        summary.rebuild(db)
+        print("✅ Rebuilt roster summary")
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init-db", help="create tables and the first admin user")
+    admin = commands.add_parser("create-admin", help="add an admin user")
+    admin.add_argument("--email", required=True)
+    admin.add_argument("--password", required=True)
+    commands.add_parser("rebuild-summary", help="recompute the dashboard counters")
+    args = parser.parse_args(argv)
+
+    if args.command == "init-db":
+        init_db()
+    elif args.command == "create-admin":
+        create_admin(args.email, args.password)
+    elif args.command == "rebuild-summary":
+        rebuild_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
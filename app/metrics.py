@@ -0,0 +1,191 @@
+"""Per-request SQL and latency instrumentation.
+
+``MetricsMiddleware`` opens a stats scope for each HTTP request. SQLAlchemy
+engine events add every query's count and duration to the scope of the
+request that issued it, and when the response finishes the request's
+latency, query count and DB time are recorded per route. ``render_metrics``
+returns everything in the Prometheus text format for ``/metrics``.
+
+Set ``QUERY_COUNT_HEADER=1`` to also return ``X-Query-Count`` and
+``X-DB-Time-Ms`` headers on every response, which is handy when hunting
+N+1 queries in the browser dev tools.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import startup
+
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats:
+    """SQL activity for one request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None and conn.info.get("query_start"):
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - conn.info["query_start"].pop()
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a label tuple."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, count, total) in sorted(self._series.items()):
+            labels = _labels(self.labels, label_values)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style counter keyed by a label tuple."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, label_values: tuple, amount: float = 1) -> None:
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value:g}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+_lock = threading.Lock()
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route"), LATENCY_BUCKETS
+)
+QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route"), LATENCY_BUCKETS
+)
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    with _lock:
+        REQUESTS.inc((method, route, status))
+        LATENCY.observe((method, route), seconds)
+        QUERIES.observe((method, route), stats.queries)
+        DB_TIME.observe((method, route), stats.db_seconds)
+
+
+def render_metrics() -> str:
+    with _lock:
+        lines = REQUESTS.render() + LATENCY.render() + QUERIES.render() + DB_TIME.render()
+    lines += [
+        "# HELP app_startup_phase_seconds Time spent in each import and startup phase.",
+        "# TYPE app_startup_phase_seconds gauge",
+    ]
+    lines += [
+        f'app_startup_phase_seconds{{phase="{_escape(name)}"}} {seconds:.6f}'
+        for name, seconds in startup.phases.items()
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _route_label(scope) -> str:
+    # The router stores the matched route in the scope; using its path
+    # template keeps label cardinality bounded (/players/{player_id}).
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL stats for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if QUERY_COUNT_HEADER:
+                    # Queries run while a streaming body is sent are not
+                    # known yet; /metrics has the full count.
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(stats.queries).encode()))
+                    headers.append((b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            record_request(scope["method"], _route_label(scope), status_code, time.perf_counter() - start, stats)
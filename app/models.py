@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Boolean
+from sqlalchemy import DDL, Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint, Boolean, event, func, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -11,14 +11,56 @@ class Player(Base):
     full_name = Column(String, nullable=False)
     jersey_number = Column(Integer, nullable=True)
     parent_email = Column(String, nullable=False)
+    # Normalised name + parent email; see app.services.identity.
+    match_key = Column(String, nullable=False, unique=True, index=True)
 
     registrations = relationship("Registration", back_populates="player", cascade="all, delete-orphan")
+    jersey_allocations = relationship("JerseyAllocation", back_populates="player", cascade="all, delete-orphan")
 
     __table_args__ = (
-        UniqueConstraint("full_name", name="uq_fullname"),
+        # Keyset pagination in app.services.listing.
+        Index("ix_players_full_name_id", "full_name", "id"),
+        # Fuzzy search in app.services.search; other databases use an
+        # in-process index instead.
+        Index(
+            "ix_players_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_players_parent_email_trgm",
+            "parent_email",
+            postgresql_using="gin",
+            postgresql_ops={"parent_email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
 
+# The trigram indexes need pg_trgm, so create it along with the table.
+event.listen(
+    Player.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(Player, "before_insert")
+def _set_match_key(mapper, connection, player):
+    from .services.identity import match_key  # local import to avoid circular issues
+
+    player.match_key = match_key(player.full_name, player.parent_email)
+
+
+@event.listens_for(Player, "before_update")
+def _update_match_key(mapper, connection, player):
+    # Only when the name or email changes: players the match_key migration
+    # kept apart with an ``#<id>`` suffix must keep it on unrelated edits.
+    state = inspect(player)
+    if state.attrs.full_name.history.has_changes() or state.attrs.parent_email.history.has_changes():
+        _set_match_key(mapper, connection, player)
+
+
 class Registration(Base):
     __tablename__ = "registrations"
 
@@ -39,9 +81,67 @@ class Registration(Base):
 
     __table_args__ = (
         UniqueConstraint("player_id", "sport", "season", name="uq_player_sport_season"),
+        # Filtered and sorted listings in app.services.listing.
+        Index("ix_registrations_division_id", "division", "id"),
+        Index("ix_registrations_created_at_id", "created_at", "id"),
     )
 
 
+# Sport filters everywhere compare lower(trim(sport)), so index that
+# expression rather than the raw column.
+Index(
+    "ix_registrations_sport_key_season_division_id",
+    func.lower(func.trim(Registration.sport)),
+    Registration.season,
+    Registration.division,
+    Registration.id,
+)
+
+
+class JerseyAllocation(Base):
+    """Jersey number reserved for a player in a division and season.
+
+    The unique constraint is what keeps concurrent allocators from handing
+    out the same number twice.
+    """
+
+    __tablename__ = "jersey_allocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    division = Column(String, nullable=False)
+    season = Column(String, nullable=False, default="")
+    number = Column(Integer, nullable=False)
+    player_id = Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    player = relationship("Player", back_populates="jersey_allocations")
+
+    __table_args__ = (
+        UniqueConstraint("division", "season", "number", name="uq_jersey_division_season_number"),
+    )
+
+
+class EmailOutbox(Base):
+    """Confirmation email waiting to be delivered by the background sender."""
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    registration_id = Column(Integer, ForeignKey("registrations.id", ondelete="CASCADE"), nullable=True, index=True)
+    to_email = Column(String, nullable=False)
+    player_name = Column(String, nullable=False)
+    jersey_number = Column(Integer, nullable=True)
+
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claim_token = Column(String, nullable=True, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
 class User(Base):
     """Application user."""
 
@@ -50,3 +150,80 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
+
+
+class InboundEmailJob(Base):
+    """Raw inbound email waiting to be processed by a background worker."""
+
+    __tablename__ = "inbound_email_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    raw_email = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class InboundMessage(Base):
+    """Fingerprint of an inbound email that has been processed.
+
+    Webhook resends are matched on Message-ID or content hash and skipped
+    before any parsing happens.
+    """
+
+    __tablename__ = "inbound_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(String, nullable=True, index=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    order_number = Column(String, nullable=True, index=True)
+    registrant_count = Column(Integer, nullable=False, default=0)
+    duplicate_count = Column(Integer, nullable=False, default=0)
+    first_seen_at = Column(DateTime, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RosterSummary(Base):
+    """Registration count per sport, season and division.
+
+    Kept current by ``app.services.summary`` as registrations are written, so
+    the dashboard never has to scan the registrations table.
+    """
+
+    __tablename__ = "roster_summary"
+
+    sport = Column(String, primary_key=True)
+    season = Column(String, primary_key=True)
+    division = Column(String, primary_key=True)
+    registrations = Column(Integer, nullable=False, default=0)
+
+
+class RosterCounter(Base):
+    """League-wide player counter such as ``players`` or ``missing_emails``."""
+
+    __tablename__ = "roster_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """Single-row counter bumped by every write to players or registrations.
+
+    Read endpoints derive their ETag and Last-Modified headers from it.
+    """
+
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Session hooks that keep the dashboard counters and the data version in
+# step with every write, registered here so any process that uses the
+# models gets them.
+from .services import data_version, summary  # noqa: F401
@@ -0,0 +1,289 @@
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+from .fingerprint import message_metadata
+
+ARCHIVE_DIR = os.getenv(
+    "INBOUND_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "inbound_archive"),
+)
+SEGMENT_MAX_BYTES = int(os.getenv("INBOUND_ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SEGMENT_MAX_SECONDS = float(os.getenv("INBOUND_ARCHIVE_SEGMENT_SECONDS", str(7 * 24 * 3600)))
+
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = ".lock"
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+_SEGMENT_RE = re.compile(r"^segment-(\d{8}T\d{6})-(\d+)\.gz$")
+
+
+def _gzip_member(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _read_member(data: bytes) -> tuple[bytes, int] | None:
+    """Decompress the gzip member at the start of ``data``.
+
+    Returns ``(payload, member_length)``, or None if the member is incomplete.
+    """
+    decompressor = zlib.decompressobj(31)
+    try:
+        payload = decompressor.decompress(data)
+    except zlib.error:
+        return None
+    if not decompressor.eof:
+        return None
+    return payload, len(data) - len(decompressor.unused_data)
+
+
+class EmailArchive:
+    """Append-only store of raw inbound emails.
+
+    Each message is written as its own gzip member appended to the current
+    segment file, so a segment is a valid ``.gz`` file (``zcat`` works) and a
+    single message can be read back by seeking to its offset. Segments
+    rotate once they reach ``segment_max_bytes`` or ``segment_max_seconds``.
+
+    ``index.jsonl`` holds one line per message with its sequence number,
+    arrival time, Message-ID, order number and location. Appends are
+    serialised with a file lock so several app processes can share a
+    directory, and both the segment and the index are fsynced before an
+    append returns. A message written to a segment but missing from the
+    index (a crash between the two writes) is re-indexed on the next append.
+    """
+
+    def __init__(
+        self,
+        directory: str = ARCHIVE_DIR,
+        segment_max_bytes: int = SEGMENT_MAX_BYTES,
+        segment_max_seconds: float = SEGMENT_MAX_SECONDS,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    # Writing
+
+    def append(self, raw_email: str, received_at: datetime | None = None) -> dict:
+        """Durably store ``raw_email`` and return its index entry."""
+        received_at = received_at or datetime.now()
+        member = _gzip_member(raw_email.encode("utf-8", "surrogateescape"))
+        meta = message_metadata(raw_email)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, LOCK_FILE), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            last = self._recover(self._last_entry())
+            segment = self._current_segment(last, received_at)
+            seq = last["seq"] + 1 if last else 1
+            if segment is None:
+                segment = f"segment-{received_at.strftime(SEGMENT_TIME_FORMAT)}-{seq:08d}.gz"
+
+            path = os.path.join(self.directory, segment)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+
+            entry = {
+                "seq": seq,
+                "received_at": received_at.isoformat(timespec="seconds"),
+                **meta,
+                "segment": segment,
+                "offset": offset,
+                "length": len(member),
+            }
+            self._write_index([entry])
+        return entry
+
+    def _current_segment(self, last: dict | None, now: datetime) -> str | None:
+        """Return the segment to append to, or None if a new one is due."""
+        if last is None:
+            return None
+        segment = last["segment"]
+        match = _SEGMENT_RE.match(segment)
+        opened = datetime.strptime(match.group(1), SEGMENT_TIME_FORMAT)
+        size = last["offset"] + last["length"]
+        if size >= self.segment_max_bytes or (now - opened).total_seconds() >= self.segment_max_seconds:
+            return None
+        return segment
+
+    def _write_index(self, entries: list[dict]) -> None:
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _last_entry(self) -> dict | None:
+        """Read the final index line without loading the whole index."""
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                block = 4096
+                while True:
+                    start = max(0, end - block)
+                    f.seek(start)
+                    tail = f.read(end - start)
+                    lines = tail.rstrip(b"\n").split(b"\n")
+                    if len(lines) > 1 or start == 0:
+                        break
+                    block *= 2
+        except FileNotFoundError:
+            return None
+        if not lines[-1]:
+            return None
+        return json.loads(lines[-1])
+
+    def _recover(self, last: dict | None) -> dict | None:
+        """Index any complete messages written after the last index entry.
+
+        A torn trailing write (a crash mid-append, never acknowledged to the
+        caller) is cut off so later appends start on a member boundary.
+        """
+        segments = self.segments()
+        if not segments:
+            return last
+        segment = segments[-1]
+        path = os.path.join(self.directory, segment)
+        # Segments are only created by append, so anything newer than the
+        # last indexed message lives in the newest segment.
+        start = last["offset"] + last["length"] if last and last["segment"] == segment else 0
+        if os.path.getsize(path) <= start:
+            return last
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        recovered = []
+        offset = 0
+        seq = last["seq"] if last else 0
+        opened = datetime.strptime(_SEGMENT_RE.match(segment).group(1), SEGMENT_TIME_FORMAT)
+        while offset < len(data):
+            result = _read_member(data[offset:])
+            if result is None:
+                break
+            payload, length = result
+            seq += 1
+            recovered.append({
+                "seq": seq,
+                "received_at": opened.isoformat(timespec="seconds"),
+                **message_metadata(payload.decode("utf-8", "surrogateescape")),
+                "segment": segment,
+                "offset": start + offset,
+                "length": length,
+                "recovered": True,
+            })
+            offset += length
+        if offset < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(start + offset)
+                os.fsync(f.fileno())
+            print(f"⚠️ Dropped {len(data) - offset} bytes of a torn write from {segment}")
+        if recovered:
+            self._write_index(recovered)
+            print(f"🩹 Re-indexed {len(recovered)} archived emails in {segment}")
+            return recovered[-1]
+        return last
+
+    # Reading
+
+    def segments(self) -> list[str]:
+        """Segment file names, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted((n for n in names if _SEGMENT_RE.match(n)), key=lambda n: int(_SEGMENT_RE.match(n).group(2)))
+
+    def entries(self):
+        """Yield every index entry in arrival order."""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def find(
+        self,
+        message_id: str | None = None,
+        order_number: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[dict]:
+        """Return index entries matching every given filter."""
+        since_iso = since.isoformat(timespec="seconds") if since else None
+        until_iso = until.isoformat(timespec="seconds") if until else None
+        return [
+            entry
+            for entry in self.entries()
+            if (message_id is None or entry["message_id"] == message_id)
+            and (order_number is None or entry["order_number"] == order_number)
+            and (since_iso is None or entry["received_at"] >= since_iso)
+            and (until_iso is None or entry["received_at"] < until_iso)
+        ]
+
+    def read(self, entry: dict) -> str:
+        """Return the raw email stored at an index entry."""
+        with open(os.path.join(self.directory, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            data = f.read(entry["length"])
+        return zlib.decompress(data, 31).decode("utf-8", "surrogateescape")
+
+    def get(self, seq: int) -> str | None:
+        """Return the raw email with sequence number ``seq``, if archived."""
+        for entry in self.entries():
+            if entry["seq"] == seq:
+                return self.read(entry)
+        return None
+
+    def iter_messages(self, since: datetime | None = None, until: datetime | None = None):
+        """Yield ``(entry, raw_email)`` pairs in arrival order.
+
+        Each segment is opened once and read sequentially.
+        """
+        handle = None
+        segment = None
+        try:
+            for entry in self.find(since=since, until=until):
+                if entry["segment"] != segment:
+                    if handle is not None:
+                        handle.close()
+                    segment = entry["segment"]
+                    handle = open(os.path.join(self.directory, segment), "rb")
+                handle.seek(entry["offset"])
+                data = handle.read(entry["length"])
+                yield entry, zlib.decompress(data, 31).decode("utf-8", "surrogateescape")
+        finally:
+            if handle is not None:
+                handle.close()
+
+
+_archive = None
+
+
+def get_archive() -> EmailArchive:
+    """Return the archive for ``INBOUND_ARCHIVE_DIR``."""
+    global _archive
+    if _archive is None:
+        _archive = EmailArchive()
+    return _archive
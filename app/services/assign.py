@@ -1,22 +1,182 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, union
 from datetime import datetime
-from ..models import Player
+from ..models import JerseyAllocation, Player
+from .upsert import upsert
 
 JERSEY_POOL = list(range(1, 100))  # 1–99
+_POOL_MAX = JERSEY_POOL[-1]
 
-def assign_jersey_number(db, division: str) -> int:
+
+class JerseyNumberTaken(Exception):
+    """Raised when a jersey number picked by hand is already in use."""
+
+    def __init__(self, number: int, division: str):
+        super().__init__(f"Jersey number {number} is already taken in division {division!r}")
+        self.number = number
+        self.division = division
+
+
+class JerseyPoolExhausted(Exception):
+    """Raised when a division has no free jersey numbers left."""
+
+    def __init__(self, division: str):
+        super().__init__(f"No free jersey numbers left in division {division!r}")
+        self.division = division
+
+
+def taken_jersey_numbers(db, divisions, season: str | None = None) -> dict[str, set[int]]:
+    """Return jersey numbers already used in each division, in one query.
+
+    A number is taken if a player registered in the division wears it or if
+    it is reserved in ``jersey_allocations``. When ``season`` is given only
+    that season's registrations and reservations count.
+    """
     from app.models import Registration  # local import to avoid circular issues
 
-    # Get all registrations for this division
-    regs = db.query(Registration).filter(Registration.division == division).all()
-    
-    # Get all jersey numbers already used by players in this division
-    taken = {reg.player.jersey_number for reg in regs if reg.player and reg.player.jersey_number}
+    taken = {division: set() for division in divisions}
+    worn = (
+        select(Registration.division, Player.jersey_number)
+        .join(Player, Registration.player_id == Player.id)
+        .where(Registration.division.in_(list(taken)), Player.jersey_number.isnot(None))
+    )
+    if season is not None:
+        worn = worn.where(Registration.season == season)
+    reserved = select(JerseyAllocation.division, JerseyAllocation.number).where(
+        JerseyAllocation.division.in_(list(taken)),
+        JerseyAllocation.season == (season or ""),
+    )
+    for division, number in db.execute(union(worn, reserved)):
+        taken[division].add(number)
+    return taken
+
+
+def _reserve(db, division: str, season: str | None, number: int, player_id: int | None) -> bool:
+    """Insert a reservation row, returning False if the number is already taken."""
+    values = {
+        "division": division,
+        "season": season or "",
+        "number": number,
+        "player_id": player_id,
+        "created_at": datetime.utcnow(),
+    }
+    return upsert(db.connection(), JerseyAllocation, values, ["division", "season", "number"])
+
+
+class JerseyAllocator:
+    """Hand out the lowest free jersey numbers per division and season.
+
+    Taken numbers are loaded with a single query the first time a division is
+    seen and kept as a bitmap, so picking a candidate is a couple of integer
+    operations. Each candidate is then reserved in ``jersey_allocations``;
+    if another worker got there first the unique constraint rejects the
+    insert and the next free number is tried. Reservations become visible to
+    other workers when the caller commits. Use one allocator per unit of work.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._taken: dict[tuple[str, str | None], int] = {}
+
+    def load(self, divisions, season: str | None = None) -> None:
+        """Load taken numbers for any of ``divisions`` not seen yet."""
+        missing = {division for division in divisions if (division, season) not in self._taken}
+        if not missing:
+            return
+        for division, numbers in taken_jersey_numbers(self.db, missing, season).items():
+            mask = 1  # bit 0 is never a valid jersey number
+            for number in numbers:
+                if 0 < number <= _POOL_MAX:
+                    mask |= 1 << number
+            self._taken[(division, season)] = mask
+
+    def allocate(
+        self,
+        division: str,
+        count: int = 1,
+        season: str | None = None,
+        player_ids: list[int] | None = None,
+    ) -> list[int]:
+        """Reserve ``count`` numbers in ``division``, lowest first.
+
+        ``player_ids``, if given, links each reservation to its player so
+        the number is released when the player is deleted. Raises
+        ``JerseyPoolExhausted`` without reserving anything if the division
+        does not have ``count`` free numbers, including when other workers
+        take the last free ones while this call is reserving.
+        """
+        if player_ids is not None:
+            count = len(player_ids)
+        key = (division, season)
+        self.load([division], season)
+        if count > _POOL_MAX + 1 - self._taken[key].bit_count():
+            raise JerseyPoolExhausted(division)
+        # Several numbers are reserved inside a savepoint so that losing
+        # races part way through does not leave earlier reservations behind.
+        savepoint = self.db.begin_nested() if count > 1 else None
+        numbers = []
+        try:
+            while len(numbers) < count:
+                mask = self._taken[key]
+                number = (~mask & (mask + 1)).bit_length() - 1
+                if number > _POOL_MAX:
+                    raise JerseyPoolExhausted(division)
+                self._taken[key] = mask | (1 << number)
+                player_id = player_ids[len(numbers)] if player_ids is not None else None
+                if _reserve(self.db, division, season, number, player_id):
+                    numbers.append(number)
+        except JerseyPoolExhausted:
+            if savepoint is not None:
+                savepoint.rollback()
+                for number in numbers:
+                    self._taken[key] &= ~(1 << number)
+            raise
+        if savepoint is not None:
+            savepoint.commit()
+        return numbers
+
+
+def assign_jersey_number(db, division: str, season: str | None = None, player_id: int | None = None) -> int:
+    """Reserve and return the lowest unused jersey number in ``division``."""
+    player_ids = [player_id] if player_id is not None else None
+    return JerseyAllocator(db).allocate(division, season=season, player_ids=player_ids)[0]
+
+
+def change_jersey_number(db, player: Player, number: int | None) -> None:
+    """Give ``player`` a hand-picked jersey number and move its reservations.
+
+    The reservations for the old number are released and ``number`` is
+    reserved in each division and season they covered, or in each one the
+    player is registered in if it held none. Raises ``JerseyNumberTaken``,
+    leaving everything as it was, if another player already has the number
+    in one of them.
+    """
+    from app.models import Registration  # local import to avoid circular issues
 
-    # Find the lowest unused number
-    for num in range(1, 100):
-        if num not in taken:
-            return num
+    if number == player.jersey_number:
+        return
+    held = []
+    if player.jersey_number is not None:
+        held = (
+            db.query(JerseyAllocation)
+            .filter(JerseyAllocation.player_id == player.id, JerseyAllocation.number == player.jersey_number)
+            .all()
+        )
+    scopes = {(allocation.division, allocation.season) for allocation in held}
+    if not scopes:
+        scopes = {
+            (division, season)
+            for division, season in db.query(Registration.division, Registration.season).filter(
+                Registration.player_id == player.id
+            )
+        }
 
-    # Fallback if all are used
-    return 99
\ No newline at end of file
+    with db.begin_nested():
+        for allocation in held:
+            db.delete(allocation)
+        db.flush()
+        if number is not None:
+            for division, season in sorted(scopes):
+                taken = taken_jersey_numbers(db, [division], season or None)[division]
+                if number in taken or not _reserve(db, division, season, number, player.id):
+                    raise JerseyNumberTaken(number, division)
+        player.jersey_number = number
@@ -0,0 +1,126 @@
+"""Roster data version for conditional GETs.
+
+``data_version`` is a single row whose counter goes up once in every
+transaction that writes to players or registrations, just before it
+commits: session flush hooks note writes through the unit of work, and a
+``do_orm_execute`` hook notes bulk ``insert()``/``update()``/``delete()``
+statements such as the roster import and the outbox marking confirmations
+sent. Read endpoints turn the version into an ``ETag`` and answer
+``304 Not Modified`` after reading only that one row.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models import DataVersion, Player, Registration
+from . import deferred
+from .upsert import upsert
+
+VERSION_ID = 1
+_TRACKED = (Player, Registration)
+
+
+def bump(connection) -> None:
+    """Increment the data version on ``connection``, creating the row if needed."""
+    now = datetime.utcnow()
+    upsert(
+        connection,
+        DataVersion,
+        {"id": VERSION_ID, "version": 1, "updated_at": now},
+        ["id"],
+        {"version": DataVersion.version + 1, "updated_at": now},
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _note_roster_writes(session, flush_context, instances):
+    session.info["roster_changed"] = any(
+        isinstance(obj, _TRACKED) for obj in (*session.new, *session.deleted)
+    ) or any(isinstance(obj, _TRACKED) and session.is_modified(obj) for obj in session.dirty)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_writes(session, flush_context):
+    if session.info.pop("roster_changed", False):
+        deferred.add(session, "data_version", Counter(writes=1))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_writes(orm_execute_state):
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    mapper = state.bind_mapper
+    if mapper is None or mapper.class_ not in _TRACKED:
+        return None
+    result = state.invoke_statement()
+    deferred.add(state.session, "data_version", Counter(writes=1))
+    return result
+
+
+# One bump per transaction, as late as possible, so the single version row
+# is only locked for the moment it takes to commit.
+@event.listens_for(Session, "before_commit")
+def _bump_on_commit(session):
+    if not deferred.is_outer_commit(session):
+        return
+    session.flush()
+    if deferred.take(session, "data_version"):
+        bump(session.connection())
+
+
+class NotModified(Exception):
+    """Raised by a read endpoint when the client's cached copy is current."""
+
+    def __init__(self, headers: dict[str, str]):
+        super().__init__("Not modified")
+        self.headers = headers
+
+
+def current(db) -> tuple[int, datetime]:
+    """Return ``(version, updated_at)``; version 0 before the first write."""
+    row = db.query(DataVersion.version, DataVersion.updated_at).filter(DataVersion.id == VERSION_ID).first()
+    if row is None:
+        return 0, datetime(1970, 1, 1)
+    return row.version, row.updated_at
+
+
+def validators(db) -> dict[str, str]:
+    """Caching headers for a response built from the current roster data."""
+    version, updated_at = current(db)
+    return {
+        "ETag": f'W/"{version}"',
+        "Last-Modified": format_datetime(updated_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True),
+        # Cache, but check back with the server before every reuse.
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified(request_headers, headers: dict[str, str]) -> bool:
+    """Whether the client's cached copy, per its ``If-None-Match``, is current.
+
+    ``If-Modified-Since`` is ignored: ``Last-Modified`` only has whole-second
+    resolution, so a write in the same second as an earlier read would leave
+    it unchanged and the stale copy would be answered with a 304.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    etag = headers["ETag"].removeprefix("W/")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def check(request_headers, db) -> dict[str, str]:
+    """Return the caching headers for a read, or raise ``NotModified``.
+
+    Call it before reading any roster data, so a 304 costs one query and
+    a response is never labelled with a version newer than its data.
+    """
+    headers = validators(db)
+    if not_modified(request_headers, headers):
+        raise NotModified(headers)
+    return headers
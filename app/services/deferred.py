@@ -0,0 +1,70 @@
+"""Counts collected by session hooks and written once, at commit.
+
+The dashboard counters and the data version are single rows that nearly
+every write touches. Updating them at each flush would hold their row locks
+from the first flush until commit and make concurrent writers queue up
+behind each other, so flush hooks ``add`` their counts here and a
+``before_commit`` hook ``take``s them and writes them just before the
+transaction commits.
+
+Counts added inside a savepoint move to the enclosing transaction when the
+savepoint is released and are dropped when it is rolled back; a rollback of
+the whole transaction drops everything.
+"""
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_INFO_KEY = "deferred_counts"
+
+
+def _pending(session) -> dict:
+    return session.info.setdefault(_INFO_KEY, {})
+
+
+def _enclosing(transaction):
+    """The savepoint enclosing ``transaction``, or None for the outer transaction."""
+    parent = transaction.parent
+    while parent is not None and not parent.nested:
+        parent = parent.parent
+    return parent
+
+
+def add(session, name: str, counts: Counter) -> None:
+    """Add ``counts`` under ``name`` to the session's current transaction."""
+    scope = _pending(session).setdefault(session.get_nested_transaction(), {})
+    scope.setdefault(name, Counter()).update(counts)
+
+
+def take(session, name: str) -> Counter:
+    """Remove and return the counts collected under ``name`` for the outer transaction."""
+    return _pending(session).get(None, {}).pop(name, Counter())
+
+
+def is_outer_commit(session) -> bool:
+    """Whether a ``before_commit`` hook is running for the outer transaction."""
+    return session.get_nested_transaction() is None
+
+
+@event.listens_for(Session, "before_commit")
+def _release_savepoint(session):
+    savepoint = session.get_nested_transaction()
+    if savepoint is None:
+        return
+    # The savepoint's last flush runs after this hook, so flush first.
+    session.flush()
+    counts = _pending(session).pop(savepoint, None)
+    if counts:
+        scope = _pending(session).setdefault(_enclosing(savepoint), {})
+        for name, counter in counts.items():
+            scope.setdefault(name, Counter()).update(counter)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    savepoint = session.get_nested_transaction()
+    if savepoint is None:
+        session.info.pop(_INFO_KEY, None)
+    else:
+        _pending(session).pop(savepoint, None)
@@ -0,0 +1,119 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from ..models import InboundEmailJob
+from .workers import WorkerPool
+
+JOB_PENDING = "pending"
+JOB_PROCESSING = "processing"
+JOB_DONE = "done"
+JOB_DEAD = "dead"
+
+MAX_ATTEMPTS = int(os.getenv("EMAIL_JOB_MAX_ATTEMPTS", "5"))
+RETRY_DELAY_SECONDS = float(os.getenv("EMAIL_JOB_RETRY_SECONDS", "30"))
+LEASE_SECONDS = float(os.getenv("EMAIL_JOB_LEASE_SECONDS", "300"))
+POLL_SECONDS = float(os.getenv("EMAIL_JOB_POLL_SECONDS", "5"))
+
+_wakeup = threading.Event()
+
+
+def enqueue_inbound_email(raw_email: str, db) -> InboundEmailJob:
+    """Persist a raw inbound email as a pending job and wake the workers."""
+    job = InboundEmailJob(raw_email=raw_email, status=JOB_PENDING, attempts=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def claim_next_job(db) -> InboundEmailJob | None:
+    """Atomically mark the oldest runnable job as processing and return it.
+
+    The claim is a conditional UPDATE, so several workers (or several uvicorn
+    processes) can poll the same table without picking up the same job.
+    Jobs left in ``processing`` longer than the lease are assumed abandoned.
+    """
+    now = datetime.utcnow()
+    runnable = (InboundEmailJob.status == JOB_PENDING) & (InboundEmailJob.available_at <= now)
+    abandoned = (InboundEmailJob.status == JOB_PROCESSING) & (
+        InboundEmailJob.updated_at < now - timedelta(seconds=LEASE_SECONDS)
+    )
+    candidates = [
+        job_id
+        for (job_id,) in db.query(InboundEmailJob.id)
+        .filter(runnable | abandoned)
+        .order_by(InboundEmailJob.id)
+        .limit(5)
+    ]
+    for job_id in candidates:
+        claimed = (
+            db.query(InboundEmailJob)
+            .filter(InboundEmailJob.id == job_id, runnable | abandoned)
+            .update(
+                {
+                    InboundEmailJob.status: JOB_PROCESSING,
+                    InboundEmailJob.attempts: InboundEmailJob.attempts + 1,
+                    InboundEmailJob.updated_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if claimed:
+            return db.get(InboundEmailJob, job_id)
+    return None
+
+
+def run_job(job: InboundEmailJob, db) -> None:
+    """Process a claimed job, scheduling a retry or dead-lettering on failure."""
+    from ..email import process_inbound_email
+
+    job_id = job.id
+    try:
+        process_inbound_email(job.raw_email, db)
+    except Exception as e:
+        db.rollback()
+        job = db.get(InboundEmailJob, job_id)
+        job.last_error = repr(e)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = JOB_DEAD
+            print(f"☠️ Inbound email job {job_id} moved to dead letter after {job.attempts} attempts: {e}")
+        else:
+            delay = RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+            job.status = JOB_PENDING
+            job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            print(f"🔁 Inbound email job {job_id} failed, retrying in {delay:.0f}s: {e}")
+        db.commit()
+        return
+
+    job.status = JOB_DONE
+    job.last_error = None
+    db.commit()
+
+
+def process_next_job(session_factory) -> bool:
+    """Claim and run one job. Return False when the queue is empty."""
+    db = session_factory()
+    try:
+        job = claim_next_job(db)
+        if job is None:
+            return False
+        run_job(job, db)
+        return True
+    finally:
+        db.close()
+
+
+class EmailWorkerPool(WorkerPool):
+    """Background threads that drain the inbound email queue."""
+
+    def __init__(self, session_factory, size: int):
+        super().__init__(
+            "email-worker",
+            size,
+            lambda: process_next_job(session_factory),
+            _wakeup,
+            POLL_SECONDS,
+        )
@@ -0,0 +1,89 @@
+import csv
+import io
+import zlib
+
+from sqlalchemy import func
+
+from ..models import Player, Registration
+
+EXPORT_COLUMNS = [
+    "Name",
+    "Parent Email",
+    "Jersey Number",
+    "Program",
+    "Sport",
+    "Season",
+    "Division",
+    "Order Number",
+    "Order Date",
+    "Confirmation Sent",
+]
+
+CHUNK_SIZE = 64 * 1024
+YIELD_PER = 500
+
+
+def export_rows(db, sport: str | None = None, season: str | None = None, division: str | None = None):
+    """Yield one row per registration (or per unregistered player).
+
+    Rows are fetched in batches through a server-side cursor where the
+    database supports it, so memory use does not depend on table size.
+    """
+    query = (
+        db.query(
+            Player.full_name,
+            Player.parent_email,
+            Player.jersey_number,
+            Registration.program,
+            Registration.sport,
+            Registration.season,
+            Registration.division,
+            Registration.order_number,
+            Registration.order_date,
+            Registration.confirmation_sent,
+        )
+        .outerjoin(Registration, Registration.player_id == Player.id)
+        .order_by(Player.id, Registration.id)
+    )
+    if sport:
+        query = query.filter(func.lower(func.trim(Registration.sport)) == sport.strip().lower())
+    if season:
+        query = query.filter(Registration.season == season)
+    if division:
+        query = query.filter(Registration.division == division)
+    return query.execution_options(yield_per=YIELD_PER)
+
+
+def csv_chunks(rows):
+    """Encode rows as CSV, yielding UTF-8 chunks of roughly ``CHUNK_SIZE``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            row.full_name,
+            row.parent_email,
+            row.jersey_number,
+            row.program,
+            row.sport,
+            row.season,
+            row.division,
+            row.order_number,
+            row.order_date.date().isoformat() if row.order_date else None,
+            "" if row.confirmation_sent is None else ("yes" if row.confirmation_sent else "no"),
+        ])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks into a single gzip stream."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
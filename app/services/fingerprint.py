@@ -0,0 +1,65 @@
+import hashlib
+import re
+from datetime import datetime
+from email.parser import HeaderParser
+
+from sqlalchemy import or_
+
+from ..models import InboundMessage
+
+# Matches "Order Number: 123" in text bodies and the header/value cells of
+# the Bluesombrero order table. Raw (undecoded) bodies are good enough here.
+_ORDER_NUMBER_RE = re.compile(r"Order Number:?\s*(?:<[^>]*>\s*)*([A-Za-z0-9-]+)", re.IGNORECASE)
+_HEADER_END_RE = re.compile(r"\r?\n\r?\n")
+
+
+def message_metadata(raw_email: str, headers=None) -> dict:
+    """Pull the Message-ID and order number out of a raw email cheaply."""
+    if headers is None:
+        headers = HeaderParser().parsestr(raw_email, headersonly=True)
+    message_id = headers.get("Message-ID")
+    match = _ORDER_NUMBER_RE.search(raw_email)
+    return {
+        "message_id": message_id.strip() if message_id else None,
+        "order_number": match.group(1) if match else None,
+    }
+
+
+def fingerprint_email(raw_email: str) -> dict:
+    """Identify a raw email without parsing its body.
+
+    The content hash covers the body only, with line endings and the MIME
+    boundary normalised, so a webhook resend with fresh transport headers
+    or a regenerated boundary still hashes the same.
+    """
+    headers = HeaderParser().parsestr(raw_email, headersonly=True)
+    split = _HEADER_END_RE.search(raw_email)
+    body = raw_email[split.end():] if split else raw_email
+    boundary = headers.get_boundary()
+    if boundary:
+        body = body.replace(boundary, "BOUNDARY")
+    body = body.replace("\r\n", "\n").strip()
+    return {
+        **message_metadata(raw_email, headers),
+        "content_hash": hashlib.sha256(body.encode("utf-8", "surrogateescape")).hexdigest(),
+    }
+
+
+def find_duplicate(fingerprint: dict, db) -> InboundMessage | None:
+    """Return the already processed message matching this fingerprint, if any."""
+    match = InboundMessage.content_hash == fingerprint["content_hash"]
+    if fingerprint["message_id"]:
+        match = or_(match, InboundMessage.message_id == fingerprint["message_id"])
+    return db.query(InboundMessage).filter(match).first()
+
+
+def record_duplicate(message: InboundMessage, db) -> None:
+    """Count a resend of ``message`` with a single UPDATE."""
+    db.query(InboundMessage).filter(InboundMessage.id == message.id).update(
+        {
+            InboundMessage.duplicate_count: InboundMessage.duplicate_count + 1,
+            InboundMessage.last_seen_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
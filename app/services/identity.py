@@ -0,0 +1,93 @@
+"""Player identity resolution.
+
+Players are identified by a match key built from the casefolded,
+whitespace-collapsed name and parent email, so "Jordan  Smith" and
+"jordan smith" from the same family are one player while another
+family's Jordan Smith is a different one. The key is stored on
+``players.match_key`` behind a unique index, so resolving a whole email's
+or import batch's registrants is a single indexed ``IN`` query.
+"""
+import difflib
+from collections import defaultdict
+
+from ..models import Player
+
+# Names from the same family at least this similar are reported as
+# possible duplicates by ``CandidateIndex``.
+NEAR_DUPLICATE_RATIO = 0.9
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def normalize_email(email: str | None) -> str:
+    return (email or "").strip().casefold()
+
+
+def match_key(full_name: str, parent_email: str | None) -> str:
+    """Return the identity key for a player name and parent email."""
+    return f"{normalize_name(full_name)}|{normalize_email(parent_email)}"
+
+
+def entry_key(entry: dict) -> str:
+    """Match key for a parsed registration or import row."""
+    return match_key(entry["full_name"], entry["parent_email"])
+
+
+def resolve_players(db, keys, columns=None) -> dict:
+    """Look up players by match key in one query.
+
+    Returns ``{match_key: Player}``, or ``{match_key: row}`` when
+    ``columns`` (e.g. ``[Player.id]``) is given to skip loading full
+    objects. Keys with no player are absent from the result.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    if columns is None:
+        return {player.match_key: player for player in db.query(Player).filter(Player.match_key.in_(keys))}
+    query = db.query(Player.match_key, *columns).filter(Player.match_key.in_(keys))
+    return {row.match_key: row for row in query}
+
+
+class CandidateIndex:
+    """In-memory index of existing players for spotting near-duplicates.
+
+    Exact matches are handled by the match key; this catches the cases it
+    deliberately does not merge, such as the same child entered with a
+    typo or with a different parent email. Lookups are dictionary hits on
+    the normalised name and email, so checking a registrant is O(1) apart
+    from comparing against the (few) players in the same family.
+    """
+
+    def __init__(self):
+        self._by_name = defaultdict(set)
+        self._by_email = defaultdict(set)
+
+    @classmethod
+    def load(cls, db) -> "CandidateIndex":
+        index = cls()
+        for full_name, parent_email in db.query(Player.full_name, Player.parent_email):
+            index.add(full_name, parent_email)
+        return index
+
+    def add(self, full_name: str, parent_email: str | None) -> None:
+        name, email = normalize_name(full_name), normalize_email(parent_email)
+        self._by_name[name].add(email)
+        self._by_email[email].add(name)
+
+    def near_duplicates(self, full_name: str, parent_email: str | None) -> list[str]:
+        """Return match keys of indexed players that may be the same child."""
+        name, email = normalize_name(full_name), normalize_email(parent_email)
+        found = [f"{name}|{other}" for other in sorted(self._by_name.get(name, ())) if other != email]
+        for other in sorted(self._by_email.get(email, ())):
+            if other != name and _similar(name, other):
+                found.append(f"{other}|{email}")
+        return found
+
+
+def _similar(a: str, b: str) -> bool:
+    if sorted(a.split()) == sorted(b.split()):
+        return True
+    return difflib.SequenceMatcher(None, a, b).ratio() >= NEAR_DUPLICATE_RATIO
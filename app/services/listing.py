@@ -0,0 +1,166 @@
+"""Filtered, keyset-paginated listings of players and registrations.
+
+Each page is fetched with ``WHERE (sort_column, id) > (last_value, last_id)
+ORDER BY sort_column, id LIMIT n`` instead of an offset, so a page costs the
+same however deep into the listing it is and rows inserted meanwhile do not
+shift later pages. The cursor handed back to the client is the last row's
+sort key, base64-encoded; it is returned on the last page too, so a client
+polling for new rows can keep asking from where it stopped.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, exists, func, or_, tuple_
+
+from ..models import Player, Registration
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+PLAYER_SORTS = {"id": Player.id, "full_name": Player.full_name}
+REGISTRATION_SORTS = {
+    "id": Registration.id,
+    "created_at": Registration.created_at,
+    "division": Registration.division,
+}
+
+
+class ListingError(ValueError):
+    """Raised for an unknown sort key or a malformed cursor."""
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, column) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+        if column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise ListingError("Malformed cursor")
+    if cursor_sort != sort:
+        raise ListingError("Cursor was issued for a different sort order")
+    return value, int(row_id)
+
+
+def _registration_filters(sport=None, season=None, division=None, confirmation_sent=None) -> list:
+    # Same matching as the dashboard, /export and bulk sends: sports ignore
+    # case and surrounding spaces, seasons match as entered, and a missing
+    # confirmation flag counts as not sent.
+    filters = []
+    if sport:
+        filters.append(func.lower(func.trim(Registration.sport)) == sport.strip().lower())
+    if season:
+        filters.append(Registration.season == season)
+    if division:
+        filters.append(Registration.division == division)
+    if confirmation_sent:
+        filters.append(Registration.confirmation_sent.is_(True))
+    elif confirmation_sent is not None:
+        filters.append(or_(Registration.confirmation_sent.is_(False), Registration.confirmation_sent.is_(None)))
+    return filters
+
+
+def _player_filters(missing_email=False, missing_jersey=False) -> list:
+    # Matches the dashboard counters in app.services.summary.
+    filters = []
+    if missing_email:
+        filters.append(or_(Player.parent_email.is_(None), Player.parent_email == ""))
+    if missing_jersey:
+        filters.append(or_(Player.jersey_number.is_(None), Player.jersey_number == 0))
+    return filters
+
+
+def _page(query, sorts: dict, id_column, sort: str, cursor: str | None, limit: int):
+    descending = sort.startswith("-")
+    column = sorts.get(sort.lstrip("-"))
+    if column is None:
+        raise ListingError(f"Unknown sort {sort!r}; use one of {', '.join(sorts)}")
+    key = tuple_(column, id_column) if column is not id_column else id_column
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, column)
+        bound = tuple_(value, row_id) if column is not id_column else row_id
+        query = query.filter(key < bound if descending else key > bound)
+    if column is id_column:
+        order = [id_column.desc() if descending else id_column]
+    else:
+        order = [column.desc(), id_column.desc()] if descending else [column, id_column]
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    rows = query.order_by(*order).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # The last page still gets a cursor so a poller can pick up rows added
+    # later; an empty page hands the request's cursor back.
+    next_cursor = cursor
+    if rows:
+        next_cursor = encode_cursor(sort, getattr(rows[-1], column.key), getattr(rows[-1], id_column.key))
+    return rows, next_cursor, has_more
+
+
+def list_players(
+    db,
+    sport=None,
+    season=None,
+    division=None,
+    confirmation_sent=None,
+    missing_email=False,
+    missing_jersey=False,
+    sort="id",
+    cursor=None,
+    limit=DEFAULT_LIMIT,
+):
+    """Return one page of players, the next cursor and whether more rows follow.
+
+    Registration filters match players with at least one registration
+    satisfying all of them.
+    """
+    query = db.query(Player.id, Player.full_name, Player.parent_email, Player.jersey_number)
+    query = query.filter(*_player_filters(missing_email, missing_jersey))
+    registration_filters = _registration_filters(sport, season, division, confirmation_sent)
+    if registration_filters:
+        query = query.filter(exists().where(and_(Registration.player_id == Player.id, *registration_filters)))
+    return _page(query, PLAYER_SORTS, Player.id, sort, cursor, limit)
+
+
+def list_registrations(
+    db,
+    sport=None,
+    season=None,
+    division=None,
+    confirmation_sent=None,
+    missing_email=False,
+    missing_jersey=False,
+    sort="id",
+    cursor=None,
+    limit=DEFAULT_LIMIT,
+):
+    """Return one page of registrations with their player, the next cursor and whether more follow."""
+    query = (
+        db.query(
+            Registration.id,
+            Registration.player_id,
+            Player.full_name,
+            Player.parent_email,
+            Player.jersey_number,
+            Registration.program,
+            Registration.division,
+            Registration.sport,
+            Registration.season,
+            Registration.order_number,
+            Registration.order_date,
+            Registration.confirmation_sent,
+            Registration.created_at,
+        )
+        .join(Player, Registration.player_id == Player.id)
+        .filter(*_registration_filters(sport, season, division, confirmation_sent))
+        .filter(*_player_filters(missing_email, missing_jersey))
+    )
+    return _page(query, REGISTRATION_SORTS, Registration.id, sort, cursor, limit)
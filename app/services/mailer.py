@@ -0,0 +1,88 @@
+import html
+import os
+import threading
+
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com")
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+FROM_EMAIL = os.getenv("CONFIRMATION_FROM_EMAIL", "noreply@posasports.org")
+SUBJECT = "Your POSA Jersey Number"
+ORDER_URL = os.getenv("JERSEY_ORDER_URL", "https://your-order-url.com")
+
+# SendGrid accepts at most 1000 personalizations per mail/send request.
+MAX_PERSONALIZATIONS = 1000
+
+# Per-recipient values are filled in by SendGrid through substitution tags.
+CONFIRMATION_HTML = (
+    "<p>Hi -player_name-,</p>"
+    "<p>Your jersey number is <strong>-jersey_number-</strong>.</p>"
+    '<p>You can order your uniform here: <a href="-order_url-">Order Jersey</a></p>'
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the shared, connection-pooling SendGrid HTTP client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+
+            _client = httpx.Client(
+                base_url=SENDGRID_API_URL,
+                headers={"Authorization": f"Bearer {SENDGRID_API_KEY}"},
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            )
+        return _client
+
+
+def close_http_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def build_confirmation_payload(messages: list[dict]) -> dict:
+    """Build one SendGrid mail/send body with a personalization per message.
+
+    Each message is a dict with ``to_email``, ``player_name`` and
+    ``jersey_number``.
+    """
+    return {
+        "from": {"email": FROM_EMAIL},
+        "subject": SUBJECT,
+        "content": [{"type": "text/html", "value": CONFIRMATION_HTML}],
+        "personalizations": [
+            {
+                "to": [{"email": message["to_email"]}],
+                # Substituted into CONFIRMATION_HTML as-is, so escape them.
+                "substitutions": {
+                    "-player_name-": html.escape(message["player_name"]),
+                    "-jersey_number-": "" if message["jersey_number"] is None else str(message["jersey_number"]),
+                    "-order_url-": html.escape(ORDER_URL),
+                },
+            }
+            for message in messages
+        ],
+    }
+
+
+def send_confirmation_batch(messages: list[dict]) -> None:
+    """Send up to ``MAX_PERSONALIZATIONS`` confirmations in one SendGrid request.
+
+    Raises ``httpx.HTTPError`` if SendGrid rejects the request.
+    """
+    if len(messages) > MAX_PERSONALIZATIONS:
+        raise ValueError(f"At most {MAX_PERSONALIZATIONS} messages fit in one request")
+    if not messages:
+        return
+    if not SENDGRID_API_KEY:
+        print(f"[DEV MODE] Skipping sending {len(messages)} confirmation emails")
+        return
+
+    response = get_http_client().post("/v3/mail/send", json=build_confirmation_payload(messages))
+    response.raise_for_status()
@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from ..models import EmailOutbox, Player, Registration
+from . import mailer
+from .workers import WorkerPool
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENDING = "sending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "4"))
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", str(mailer.MAX_PERSONALIZATIONS)))
+# SendGrid limits mail/send requests, not recipients: 600 a minute.
+RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "10"))
+RATE_BURST = int(os.getenv("EMAIL_RATE_BURST", "10"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_SEND_MAX_ATTEMPTS", "6"))
+BACKOFF_SECONDS = float(os.getenv("EMAIL_SEND_BACKOFF_SECONDS", "30"))
+LEASE_SECONDS = float(os.getenv("EMAIL_SEND_LEASE_SECONDS", "300"))
+POLL_SECONDS = float(os.getenv("EMAIL_SEND_POLL_SECONDS", "5"))
+
+_wakeup = threading.Event()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> None:
+        """Block until ``tokens`` (at most ``capacity``) are available, then take them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def queue_confirmations(registrations, db) -> int:
+    """Add a confirmation email to the outbox for each registration in the query.
+
+    Registrations that already have an undelivered message queued are
+    skipped. Returns the number of messages queued.
+    """
+    rows = (
+        registrations.join(Player, Registration.player_id == Player.id)
+        .with_entities(Registration.id, Player.parent_email, Player.full_name, Player.jersey_number)
+        .order_by(Registration.id)
+        .all()
+    )
+    if not rows:
+        return 0
+    queued = {
+        registration_id
+        for (registration_id,) in db.query(EmailOutbox.registration_id).filter(
+            EmailOutbox.registration_id.in_([row.id for row in rows]),
+            EmailOutbox.status.in_([OUTBOX_PENDING, OUTBOX_SENDING]),
+        )
+    }
+    now = datetime.utcnow()
+    values = [
+        {
+            "registration_id": row.id,
+            "to_email": row.parent_email,
+            "player_name": row.full_name,
+            "jersey_number": row.jersey_number,
+            "status": OUTBOX_PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for row in rows
+        if row.id not in queued
+    ]
+    if values:
+        db.execute(insert(EmailOutbox), values)
+    db.commit()
+    _wakeup.set()
+    return len(values)
+
+
+def claim_batch(db, limit: int) -> list[EmailOutbox]:
+    """Claim up to ``limit`` due messages for this sender.
+
+    Claimed rows are stamped with a fresh token in one conditional UPDATE,
+    so concurrent senders never get the same message. Messages stuck in
+    ``sending`` past the lease are picked up again.
+    """
+    now = datetime.utcnow()
+    due = (EmailOutbox.status == OUTBOX_PENDING) & (EmailOutbox.next_attempt_at <= now)
+    stale = (EmailOutbox.status == OUTBOX_SENDING) & (
+        EmailOutbox.updated_at < now - timedelta(seconds=LEASE_SECONDS)
+    )
+    ids = [
+        message_id
+        for (message_id,) in db.query(EmailOutbox.id).filter(due | stale).order_by(EmailOutbox.id).limit(limit)
+    ]
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids), due | stale).update(
+        {
+            EmailOutbox.status: OUTBOX_SENDING,
+            EmailOutbox.claim_token: token,
+            EmailOutbox.attempts: EmailOutbox.attempts + 1,
+            EmailOutbox.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).order_by(EmailOutbox.id).all()
+
+
+def deliver_batch(messages: list[EmailOutbox], db) -> bool:
+    """Send claimed messages in one provider request and record the outcome.
+
+    On success the messages are marked sent and their registrations'
+    ``confirmation_sent`` flags are set with one UPDATE. On failure each
+    message is rescheduled with exponential backoff, or marked failed once
+    it has used up its attempts.
+    """
+    try:
+        mailer.send_confirmation_batch([
+            {"to_email": m.to_email, "player_name": m.player_name, "jersey_number": m.jersey_number}
+            for m in messages
+        ])
+    except Exception as e:
+        now = datetime.utcnow()
+        for message in messages:
+            message.claim_token = None
+            message.last_error = repr(e)
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = OUTBOX_FAILED
+            else:
+                message.status = OUTBOX_PENDING
+                message.next_attempt_at = now + timedelta(seconds=BACKOFF_SECONDS * 2 ** (message.attempts - 1))
+        db.commit()
+        print(f"🔁 Failed to send {len(messages)} confirmation emails: {e}")
+        return False
+
+    now = datetime.utcnow()
+    db.query(EmailOutbox).filter(EmailOutbox.id.in_([m.id for m in messages])).update(
+        {
+            EmailOutbox.status: OUTBOX_SENT,
+            EmailOutbox.sent_at: now,
+            EmailOutbox.claim_token: None,
+            EmailOutbox.last_error: None,
+        },
+        synchronize_session=False,
+    )
+    registration_ids = [m.registration_id for m in messages if m.registration_id is not None]
+    if registration_ids:
+        db.query(Registration).filter(Registration.id.in_(registration_ids)).update(
+            {Registration.confirmation_sent: True}, synchronize_session=False
+        )
+    db.commit()
+    return True
+
+
+def process_outbox_batch(session_factory, bucket: TokenBucket | None = None) -> int:
+    """Claim, rate limit and deliver one batch. Returns the number of messages handled.
+
+    The whole batch goes out in one provider request, which takes one token
+    from ``bucket``.
+    """
+    limit = min(BATCH_SIZE, mailer.MAX_PERSONALIZATIONS)
+    db = session_factory()
+    try:
+        messages = claim_batch(db, limit)
+        if not messages:
+            return 0
+        if bucket is not None:
+            bucket.acquire()
+        deliver_batch(messages, db)
+        return len(messages)
+    finally:
+        db.close()
+
+
+class OutboxSender(WorkerPool):
+    """Background threads that drain the email outbox.
+
+    ``size`` threads bound how many provider requests are in flight at once;
+    all of them share one token bucket so the combined request rate stays
+    within the provider quota.
+    """
+
+    def __init__(self, session_factory, size: int = SEND_CONCURRENCY):
+        self.bucket = TokenBucket(RATE_PER_SECOND, RATE_BURST)
+        super().__init__(
+            "email-sender",
+            size,
+            lambda: process_outbox_batch(session_factory, self.bucket),
+            _wakeup,
+            POLL_SECONDS,
+        )
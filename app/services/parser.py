@@ -0,0 +1,225 @@
+import importlib.util
+import re
+from datetime import datetime
+from functools import lru_cache
+
+SEASONS = ["fall", "spring", "summer", "winter"]
+SPORTS = ["soccer", "basketball", "baseball", "softball", "volleyball", "flag"]
+
+# Token -> (kind, priority). When a program names several seasons or sports
+# the one listed first above wins, as it always has.
+_PROGRAM_TOKENS = {
+    **{season: ("season", rank) for rank, season in enumerate(SEASONS)},
+    **{sport: ("sport", rank) for rank, sport in enumerate(SPORTS)},
+}
+
+_FIELDS = {
+    "name": "full_name",
+    "program": "program",
+    "division": "division",
+    "parent email": "parent_email",
+    "order number": "order_number",
+    "order date": "order_date",
+}
+_REQUIRED = [("full_name", "Name"), ("program", "Program"), ("division", "Division"), ("parent_email", "Parent Email")]
+
+# Longer keys first so "Parent Email" is not read as something shorter.
+_FIELD_RE = re.compile(
+    r"(parent email|order number|order date|program|division|name):\s*(.+)",
+    re.IGNORECASE,
+)
+NAME_RE = re.compile(r"Name:\s*", re.IGNORECASE)
+ORDER_DETAILS_RE = re.compile("Order Details", re.IGNORECASE)
+
+ORDER_DATE_FORMAT = "%B %d, %Y"
+
+
+class MissingFields(ValueError):
+    """Raised when a registrant block lacks required fields."""
+
+    def __init__(self, missing: list[str]):
+        super().__init__(", ".join(missing))
+        self.missing = missing
+
+
+@lru_cache(maxsize=1024)
+def classify_program(program: str) -> tuple[str, str]:
+    """Map a program name like "Fall 2024 Soccer" to ``(sport, season)``."""
+    best = {"sport": None, "season": None}
+    for token in program.lower().split():
+        kind_rank = _PROGRAM_TOKENS.get(token)
+        if kind_rank is None:
+            continue
+        kind, rank = kind_rank
+        if best[kind] is None or rank < best[kind]:
+            best[kind] = rank
+    sport = SPORTS[best["sport"]] if best["sport"] is not None else "unknown"
+    season = SEASONS[best["season"]] if best["season"] is not None else "unknown"
+    return sport, season
+
+
+def parse_order_date(value: str) -> datetime:
+    return datetime.strptime(value.strip(), ORDER_DATE_FORMAT)
+
+
+@lru_cache(maxsize=None)
+def html_features() -> str:
+    """Return the fastest installed BeautifulSoup tree builder."""
+    return "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+class HtmlBody:
+    """An HTML email body parsed into a tree once.
+
+    The text and order-table paths both read from the same tree, and the
+    extracted text is cached, so a message is never parsed twice.
+    """
+
+    def __init__(self, html: str):
+        from bs4 import BeautifulSoup
+
+        self.soup = BeautifulSoup(html, html_features())
+        self._text = None
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+
+class RegistrantParser:
+    """Turn inbound email content into registration dicts.
+
+    Used by both the ``Key: value`` text path and the Bluesombrero order
+    table path so they classify programs and shape entries the same way.
+    """
+
+    def fields(self, text: str) -> dict[str, str]:
+        """Extract every known ``Key: value`` field from ``text`` in one pass.
+
+        The first occurrence of each key wins.
+        """
+        found = {}
+        for match in _FIELD_RE.finditer(text):
+            found.setdefault(_FIELDS[match.group(1).lower()], match.group(2).strip())
+        return found
+
+    def registration(
+        self,
+        full_name: str,
+        program: str,
+        division: str,
+        parent_email: str | None,
+        order_number: str | None = None,
+        order_date: datetime | None = None,
+    ) -> dict:
+        sport, season = classify_program(program)
+        return {
+            "full_name": full_name,
+            "program": program,
+            "division": division,
+            "parent_email": parent_email,
+            "order_number": order_number,
+            "order_date": order_date,
+            "sport": sport,
+            "season": season,
+        }
+
+    def parse_block(self, text: str) -> dict:
+        """Parse one registrant block, raising ``MissingFields`` if incomplete."""
+        found = self.fields(text)
+        missing = [label for key, label in _REQUIRED if key not in found]
+        if missing:
+            raise MissingFields(missing)
+        order_date = found.get("order_date")
+        return self.registration(
+            found["full_name"],
+            found["program"],
+            found["division"],
+            found["parent_email"],
+            found.get("order_number"),
+            parse_order_date(order_date) if order_date else None,
+        )
+
+    def parse_text(self, text: str) -> list[dict]:
+        """Parse blank-line separated registrant blocks from plain text."""
+        # Clean up formatting issues
+        text = text.replace("\r\n", "\n").replace("=\n", "").strip()
+
+        # Split by lines and chunk into blocks per registrant
+        registrant_blocks = []
+        current_block = []
+        for line in text.splitlines():
+            if line.strip() == "":
+                if current_block:
+                    registrant_blocks.append(current_block)
+                    current_block = []
+            else:
+                current_block.append(line)
+        if current_block:
+            registrant_blocks.append(current_block)
+
+        parsed_regs = []
+        for block in registrant_blocks:
+            full_text = "\n".join(block)
+
+            # Skip adult leagues and camps
+            if "Adult League Softball" in full_text or "Camp" in full_text:
+                print("⏭ Skipping non-youth program")
+                continue
+
+            try:
+                parsed_regs.append(self.parse_block(full_text))
+            except MissingFields as e:
+                print(f"❌ Skipping entry, missing: {e}")
+            except Exception as e:
+                print(f"❌ Error processing registrant block: {e}")
+        return parsed_regs
+
+    def parse_order_table(self, body: HtmlBody, parent_email: str | None) -> list[dict]:
+        """Parse a Bluesombrero "Order Details" table.
+
+        Order metadata rows and registrant rows (two spans: name and
+        "Program - Division") are picked up in a single pass over the rows.
+        """
+        order_table = None
+        for table in body.soup.find_all("table"):
+            if table.find(string=ORDER_DETAILS_RE):
+                order_table = table
+                break
+        if order_table is None:
+            return []
+
+        order_number = None
+        order_date = None
+        registrants = []
+        for row in order_table.find_all("tr"):
+            cells = row.find_all(["td", "th"])
+            if len(cells) >= 2:
+                header = cells[0].get_text(strip=True).lower()
+                if "order number" in header:
+                    order_number = cells[1].get_text(strip=True)
+                elif "order date" in header:
+                    try:
+                        order_date = parse_order_date(cells[1].get_text(strip=True))
+                    except Exception:
+                        order_date = None
+
+            spans = row.find_all("span")
+            if len(spans) >= 2:
+                full_name = spans[0].get_text(strip=True)
+                prog_div = spans[1].get_text(strip=True)
+                if " - " in prog_div:
+                    program, division = [p.strip() for p in prog_div.split(" - ", 1)]
+                else:
+                    program = prog_div.strip()
+                    division = ""
+                registrants.append((full_name, program, division))
+
+        return [
+            self.registration(full_name, program, division, parent_email, order_number, order_date)
+            for full_name, program, division in registrants
+        ]
+
+
+registrant_parser = RegistrantParser()
@@ -0,0 +1,241 @@
+import csv
+import io
+from collections import Counter, defaultdict
+from itertools import islice
+
+from sqlalchemy import insert, update
+
+from ..models import Player, Registration
+from .assign import JerseyAllocator, JerseyPoolExhausted
+from .identity import entry_key, resolve_players
+from .search import track_player
+from .summary import defer_deltas, sport_key
+from .parser import classify_program
+
+# Accepted header spellings for each field, compared case-insensitively.
+IMPORT_COLUMNS = {
+    "full_name": ("name", "full name", "player", "player name"),
+    "parent_email": ("parent email", "email", "parent_email"),
+    "program": ("program",),
+    "division": ("division",),
+    "sport": ("sport",),
+    "season": ("season",),
+}
+REQUIRED_COLUMNS = ["full_name", "parent_email", "division"]
+
+BATCH_SIZE = 1000
+
+
+class ImportHeaderError(ValueError):
+    """Raised when the CSV header lacks required columns."""
+
+
+def _column_map(header: list[str]) -> dict[str, int]:
+    names = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in IMPORT_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportHeaderError(f"Missing columns: {', '.join(missing)}")
+    if "program" not in columns and not {"sport", "season"} <= columns.keys():
+        raise ImportHeaderError("Need either a program column or sport and season columns")
+    return columns
+
+
+def read_rows(stream):
+    """Yield ``(line_number, fields, errors)`` for each data row of a CSV stream.
+
+    ``stream`` is a binary file object; it is decoded and parsed
+    incrementally, so the upload is never held in memory as a whole.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        try:
+            header = next(reader)
+        except StopIteration:
+            raise ImportHeaderError("The file is empty")
+        columns = _column_map(header)
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            fields = {
+                field: row[index].strip() if index < len(row) else ""
+                for field, index in columns.items()
+            }
+            yield (reader.line_num, *validate_row(fields))
+    finally:
+        # Leave the upload's own file object open for its owner to close.
+        text.detach()
+
+
+def validate_row(fields: dict) -> tuple[dict, list[str]]:
+    """Normalise one row, returning the registration fields and any errors."""
+    errors = [f"{field} is required" for field in REQUIRED_COLUMNS if not fields.get(field)]
+    email = fields.get("parent_email", "")
+    if email and ("@" not in email or " " in email):
+        errors.append(f"invalid parent email {email!r}")
+
+    program = fields.get("program", "")
+    sport = fields.get("sport", "").lower()
+    season = fields.get("season", "").lower()
+    if program and not (sport and season):
+        program_sport, program_season = classify_program(program)
+        sport = sport or program_sport
+        season = season or program_season
+    if not sport or sport == "unknown":
+        errors.append("sport is required")
+    if not season or season == "unknown":
+        errors.append("season is required")
+
+    return {
+        "full_name": fields.get("full_name", ""),
+        "parent_email": email,
+        "program": program or f"{season} {sport}",
+        "division": fields.get("division", ""),
+        "sport": sport,
+        "season": season,
+    }, errors
+
+
+def import_roster(stream, db, batch_size: int = BATCH_SIZE) -> dict:
+    """Import a roster CSV in one transaction and report per-row problems.
+
+    Rows are validated as they stream in and written in batches: one query
+    each for existing players and their registrations, one multi-row insert
+    for new players, jersey numbers reserved per division, then one
+    multi-row insert for registrations. Invalid rows are skipped and listed
+    in the report; everything else commits together at the end.
+    """
+    report = {"imported": 0, "new_players": 0, "errors": [], "warnings": []}
+    seen = {}
+    allocator = JerseyAllocator(db)
+    rows = read_rows(stream)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        batch = []
+        for line, entry, errors in chunk:
+            key = (entry_key(entry), entry["sport"], entry["season"])
+            if not errors and key in seen:
+                errors = [f"duplicate of line {seen[key]}"]
+            if errors:
+                report["errors"].append({"line": line, "name": entry["full_name"], "errors": errors})
+                continue
+            seen[key] = line
+            batch.append((line, entry))
+        if batch:
+            _import_batch(batch, db, allocator, report)
+    db.commit()
+    return report
+
+
+def _import_batch(batch, db, allocator: JerseyAllocator, report: dict) -> None:
+    players = {
+        key: row.id for key, row in resolve_players(db, {entry_key(entry) for _, entry in batch}, [Player.id]).items()
+    }
+    registered = set()
+    if players:
+        registered = {
+            (player_id, sport, season)
+            for player_id, sport, season in db.query(
+                Registration.player_id, Registration.sport, Registration.season
+            ).filter(Registration.player_id.in_(players.values()))
+        }
+
+    # One multi-row INSERT ... RETURNING for players not in the database yet.
+    new_entries = {}
+    for _, entry in batch:
+        key = entry_key(entry)
+        if key not in players:
+            new_entries.setdefault(key, entry)
+    if new_entries:
+        result = db.execute(
+            insert(Player).returning(Player.id, Player.match_key, sort_by_parameter_order=True),
+            [
+                {"full_name": entry["full_name"], "parent_email": entry["parent_email"], "match_key": key}
+                for key, entry in new_entries.items()
+            ],
+        )
+        for player_id, key in result:
+            players[key] = player_id
+            track_player(db, player_id, new_entries[key]["full_name"], new_entries[key]["parent_email"])
+        numbered = _assign_numbers(new_entries, players, db, allocator, report)
+        report["new_players"] += len(new_entries)
+
+    registrations = []
+    for line, entry in batch:
+        player_id = players[entry_key(entry)]
+        key = (player_id, entry["sport"], entry["season"])
+        if key in registered:
+            report["errors"].append({
+                "line": line,
+                "name": entry["full_name"],
+                "errors": [f"already registered for {entry['sport']} {entry['season']}"],
+            })
+            continue
+        registered.add(key)
+        registrations.append({
+            "player_id": player_id,
+            "program": entry["program"],
+            "division": entry["division"],
+            "sport": entry["sport"],
+            "season": entry["season"],
+            "confirmation_sent": False,
+        })
+    if registrations:
+        db.execute(insert(Registration), registrations)
+    report["imported"] += len(registrations)
+
+    # Bulk statements skip the session's flush hooks, so hand the dashboard
+    # counter changes over directly.
+    counters = Counter()
+    if new_entries:
+        counters["players"] = len(new_entries)
+        counters["missing_emails"] = sum(1 for entry in new_entries.values() if not entry["parent_email"])
+        counters["missing_jerseys"] = len(new_entries) - numbered
+    summary = Counter(
+        (sport_key(row["sport"]), row["season"], row["division"]) for row in registrations
+    )
+    defer_deltas(db, summary, counters)
+
+
+def _assign_numbers(new_entries: dict, players: dict, db, allocator: JerseyAllocator, report: dict) -> int:
+    """Reserve jersey numbers for new players, one allocation per division.
+
+    Returns how many players got a number.
+    """
+    groups = defaultdict(list)
+    divisions_by_season = defaultdict(set)
+    for key, entry in new_entries.items():
+        groups[(entry["division"], entry["season"])].append(key)
+        divisions_by_season[entry["season"]].add(entry["division"])
+    for season, divisions in divisions_by_season.items():
+        allocator.load(divisions, season)
+
+    numbers = []
+    for (division, season), keys in groups.items():
+        player_ids = [players[key] for key in keys]
+        try:
+            assigned = allocator.allocate(division, season=season, player_ids=player_ids)
+        except JerseyPoolExhausted:
+            # Fill what the pool still has; the rest need numbers by hand.
+            assigned = []
+            for player_id in player_ids:
+                try:
+                    assigned += allocator.allocate(division, season=season, player_ids=[player_id])
+                except JerseyPoolExhausted:
+                    break
+            for key in keys[len(assigned):]:
+                name = new_entries[key]["full_name"]
+                report["warnings"].append(f"{name}: no free jersey number left in {division}")
+        numbers += [{"id": player_id, "jersey_number": n} for player_id, n in zip(player_ids, assigned)]
+    if numbers:
+        db.execute(update(Player), numbers)
+    return len(numbers)
@@ -0,0 +1,179 @@
+"""Fuzzy player search over names and parent emails.
+
+On Postgres the search runs in the database with ``pg_trgm``: the GIN
+trigram indexes on ``players.full_name`` and ``players.parent_email``
+serve the ``<%`` (word similarity) operator and results are ranked by
+``word_similarity``. Other databases (SQLite in development and tests) use
+``NgramIndex``, an in-process trigram index with the same scoring. It is
+built on the first search and then kept current by session events, which
+apply a transaction's player inserts, updates and deletes once it commits.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, func, literal, or_
+from sqlalchemy.orm import Session
+
+from ..models import Player
+
+# pg_trgm's default word_similarity_threshold.
+MIN_SCORE = 0.6
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of each word, padded the way pg_trgm pads them."""
+    grams = set()
+    for word in _WORD_RE.findall(text.casefold()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """Trigram index over player names and parent emails.
+
+    A query's score against a player is the share of its trigrams found in
+    the name or the email, whichever is higher, which approximates
+    pg_trgm's ``word_similarity``. Only players sharing a trigram with the
+    query are scored, so lookups stay fast as the table grows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(set)
+        self._docs = {}
+
+    def add(self, player_id: int, full_name: str, parent_email: str | None) -> None:
+        fields = (frozenset(trigrams(full_name or "")), frozenset(trigrams(parent_email or "")))
+        with self._lock:
+            self._discard(player_id)
+            self._docs[player_id] = (full_name or "", fields)
+            for gram in fields[0] | fields[1]:
+                self._postings[gram].add(player_id)
+
+    def remove(self, player_id: int) -> None:
+        with self._lock:
+            self._discard(player_id)
+
+    def _discard(self, player_id: int) -> None:
+        doc = self._docs.pop(player_id, None)
+        if doc is None:
+            return
+        for gram in doc[1][0] | doc[1][1]:
+            postings = self._postings[gram]
+            postings.discard(player_id)
+            if not postings:
+                del self._postings[gram]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(self, query: str, min_score: float = MIN_SCORE) -> list[tuple[int, float]]:
+        """Return ``(player_id, score)`` pairs, best match first."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        with self._lock:
+            candidates = Counter()
+            for gram in grams:
+                candidates.update(self._postings.get(gram, ()))
+            results = []
+            for player_id, shared in candidates.items():
+                if shared / len(grams) < min_score:
+                    continue
+                name, (name_grams, email_grams) = self._docs[player_id]
+                score = max(len(grams & name_grams), len(grams & email_grams)) / len(grams)
+                if score >= min_score:
+                    results.append((player_id, score, name.casefold()))
+        results.sort(key=lambda r: (-r[1], r[2], r[0]))
+        return [(player_id, score) for player_id, score, _ in results]
+
+
+_index: NgramIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index(db) -> NgramIndex:
+    """Return the process-wide index, building it from ``db`` on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = NgramIndex()
+                for player_id, full_name, parent_email in db.query(Player.id, Player.full_name, Player.parent_email):
+                    index.add(player_id, full_name, parent_email)
+                _index = index
+    return _index
+
+
+def reset_index() -> None:
+    """Drop the in-process index; the next search rebuilds it."""
+    global _index
+    _index = None
+
+
+def track_player(db, player_id: int, full_name: str, parent_email: str | None) -> None:
+    """Queue an index update for a player written without the ORM unit of work."""
+    db.info.setdefault("search_changes", []).append((player_id, full_name, parent_email))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    if _index is None:
+        return
+    changes = [
+        (obj.id, obj.full_name, obj.parent_email)
+        for obj in (*session.new, *session.dirty)
+        if isinstance(obj, Player)
+    ]
+    changes += [(obj.id, None, None) for obj in session.deleted if isinstance(obj, Player)]
+    if changes:
+        session.info.setdefault("search_changes", []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    changes = session.info.pop("search_changes", None)
+    if not changes or _index is None:
+        return
+    for player_id, full_name, parent_email in changes:
+        if full_name is None:
+            _index.remove(player_id)
+        else:
+            _index.add(player_id, full_name, parent_email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("search_changes", None)
+
+
+def search_players(db, query: str, limit: int = 20, offset: int = 0) -> tuple[list[tuple[Player, float]], bool]:
+    """Return one page of ``(player, score)`` matches and whether more follow."""
+    query = query.strip()
+    if not query:
+        return [], False
+
+    if db.get_bind().dialect.name == "postgresql":
+        score = func.greatest(
+            func.word_similarity(query, Player.full_name),
+            func.word_similarity(query, func.coalesce(Player.parent_email, "")),
+        ).label("score")
+        rows = (
+            db.query(Player, score)
+            .filter(or_(literal(query).op("<%")(Player.full_name), literal(query).op("<%")(Player.parent_email)))
+            .order_by(score.desc(), func.lower(Player.full_name), Player.id)
+            .offset(offset)
+            .limit(limit + 1)
+            .all()
+        )
+        return [(player, float(s)) for player, s in rows[:limit]], len(rows) > limit
+
+    ranked = get_index(db).search(query)
+    page = ranked[offset:offset + limit]
+    players = {p.id: p for p in db.query(Player).filter(Player.id.in_([player_id for player_id, _ in page]))}
+    results = [(players[player_id], score) for player_id, score in page if player_id in players]
+    return results, len(ranked) > offset + limit
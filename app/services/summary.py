@@ -0,0 +1,196 @@
+"""Incrementally maintained dashboard counters.
+
+``roster_summary`` holds the number of registrations per (sport, season,
+division) and ``roster_counters`` the league-wide player totals shown at
+the top of the dashboard. Session flush hooks work out how each flush
+changes them from the players and registrations it inserts, updates or
+deletes, and apply the difference in the same transaction, so the counters
+commit or roll back together with the rows they describe.
+
+Deltas from every flush are added up and written once, just before the
+transaction commits, so the hot counter rows are only locked briefly (see
+``app.services.deferred``). Writes that bypass the unit of work (the bulk
+roster import) hand their deltas to ``defer_deltas`` themselves.
+``rebuild`` recomputes everything from scratch; run it with
+``python -m app.manage rebuild-summary`` if the counters ever drift.
+"""
+from collections import Counter
+
+from sqlalchemy import case, delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from ..models import Player, Registration, RosterCounter, RosterSummary
+from . import deferred
+from .upsert import upsert
+
+COUNTERS = ("players", "missing_emails", "missing_jerseys")
+
+
+def sport_key(sport: str | None) -> str:
+    """The dashboard groups sports case- and whitespace-insensitively."""
+    return (sport or "").strip().lower()
+
+
+def _email_missing(email) -> bool:
+    return not email
+
+
+def _jersey_missing(number) -> bool:
+    return not number
+
+
+def _old_value(obj, attr: str):
+    history = inspect(obj).attrs[attr].load_history()
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous value when one of these is assigned, even if it was
+# expired, so the flush hook can always tell what changed.
+for _attribute in (
+    Player.parent_email, Player.jersey_number, Registration.sport, Registration.season, Registration.division
+):
+    event.listen(_attribute, "set", _keep_old_value, active_history=True)
+
+
+def _summary_key(sport, season, division) -> tuple[str, str, str]:
+    return sport_key(sport), season or "", division or ""
+
+
+def _player_flags(email, number) -> Counter:
+    return Counter(players=1, missing_emails=int(_email_missing(email)), missing_jerseys=int(_jersey_missing(number)))
+
+
+def flush_deltas(session) -> tuple[Counter, Counter]:
+    """Return ``(registration deltas, counter deltas)`` for a pending flush."""
+    registrations = Counter()
+    counters = Counter()
+    for obj in session.new:
+        if isinstance(obj, Player):
+            counters.update(_player_flags(obj.parent_email, obj.jersey_number))
+        elif isinstance(obj, Registration):
+            registrations[_summary_key(obj.sport, obj.season, obj.division)] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Player):
+            counters.update(_player_flags(obj.parent_email, obj.jersey_number))
+            counters.subtract(_player_flags(_old_value(obj, "parent_email"), _old_value(obj, "jersey_number")))
+        elif isinstance(obj, Registration):
+            new = _summary_key(obj.sport, obj.season, obj.division)
+            old = _summary_key(*(_old_value(obj, attr) for attr in ("sport", "season", "division")))
+            if new != old:
+                registrations[new] += 1
+                registrations[old] -= 1
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            counters.subtract(_player_flags(_old_value(obj, "parent_email"), _old_value(obj, "jersey_number")))
+        elif isinstance(obj, Registration):
+            old = _summary_key(*(_old_value(obj, attr) for attr in ("sport", "season", "division")))
+            registrations[old] -= 1
+    return registrations, counters
+
+
+def _add(connection, table, key_columns: dict, value_column, delta: int) -> None:
+    """``value += delta`` for one row, creating the row if needed."""
+    upsert(
+        connection,
+        table,
+        {**key_columns, value_column.key: delta},
+        list(key_columns),
+        {value_column.key: value_column + delta},
+    )
+
+
+def apply_deltas(connection, registrations: Counter, counters: Counter) -> None:
+    """Add the given changes to the summary tables on ``connection``."""
+    for (sport, season, division), delta in sorted(registrations.items()):
+        if delta:
+            _add(
+                connection,
+                RosterSummary,
+                {"sport": sport, "season": season, "division": division},
+                RosterSummary.registrations,
+                delta,
+            )
+    for name in sorted(counters):
+        if counters[name]:
+            _add(connection, RosterCounter, {"name": name}, RosterCounter.value, counters[name])
+
+
+def defer_deltas(session, registrations: Counter, counters: Counter) -> None:
+    """Add changes to be written to the summary tables when ``session`` commits."""
+    deferred.add(session, "roster_summary", registrations)
+    deferred.add(session, "roster_counters", counters)
+
+
+# Deltas are worked out before the flush, while deleted rows can still be
+# loaded, kept once the flush has succeeded and written at commit.
+@event.listens_for(Session, "before_flush")
+def _collect_summary_deltas(session, flush_context, instances):
+    session.info["summary_deltas"] = flush_deltas(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _keep_summary_deltas(session, flush_context):
+    deltas = session.info.pop("summary_deltas", None)
+    if deltas is not None:
+        defer_deltas(session, *deltas)
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_summary_deltas(session):
+    if not deferred.is_outer_commit(session):
+        return
+    session.flush()
+    apply_deltas(
+        session.connection(), deferred.take(session, "roster_summary"), deferred.take(session, "roster_counters")
+    )
+
+
+def rebuild(db) -> None:
+    """Recompute both summary tables from the players and registrations."""
+    db.execute(delete(RosterSummary))
+    db.execute(delete(RosterCounter))
+    sport = func.lower(func.trim(func.coalesce(Registration.sport, "")))
+    db.execute(
+        insert(RosterSummary).from_select(
+            ["sport", "season", "division", "registrations"],
+            select(sport, Registration.season, Registration.division, func.count())
+            .group_by(sport, Registration.season, Registration.division),
+        )
+    )
+    players, missing_emails, missing_jerseys = db.execute(
+        select(
+            func.count(Player.id),
+            func.count(case((or_(Player.parent_email.is_(None), Player.parent_email == ""), 1))),
+            func.count(case((or_(Player.jersey_number.is_(None), Player.jersey_number == 0), 1))),
+        )
+    ).one()
+    db.execute(
+        insert(RosterCounter),
+        [
+            {"name": "players", "value": players},
+            {"name": "missing_emails", "value": missing_emails},
+            {"name": "missing_jerseys", "value": missing_jerseys},
+        ],
+    )
+    db.commit()
+
+
+def dashboard_counts(db) -> tuple[dict, list[tuple[str, str]]]:
+    """Return the dashboard counters and the (sport, division) pairs in use."""
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(db.query(RosterCounter.name, RosterCounter.value).all())
+    pairs = (
+        db.query(RosterSummary.sport, RosterSummary.division)
+        .filter(RosterSummary.registrations > 0)
+        .distinct()
+        .all()
+    )
+    return counters, pairs
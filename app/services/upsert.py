@@ -0,0 +1,47 @@
+"""Single-statement "insert or update" across the databases the app runs on.
+
+Postgres and SQLite get ``INSERT ... ON CONFLICT``; anything else falls back
+to an UPDATE followed by an INSERT, or to an INSERT in a savepoint when a
+conflict should just be skipped.
+"""
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+
+def _dialect_insert(connection):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def upsert(connection, model, values: dict, index_elements: list[str], set_: dict | None = None) -> bool:
+    """Insert ``values``, or on a conflict over ``index_elements`` apply ``set_``.
+
+    Without ``set_`` a conflicting row is left alone. Returns False only in
+    that case, when nothing was written.
+    """
+    dialect_insert = _dialect_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(model).values(**values)
+        if set_ is None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+        return connection.execute(stmt).rowcount == 1
+
+    if set_ is None:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(model).values(**values))
+        except IntegrityError:
+            return False
+        return True
+    where = [getattr(model, name) == values[name] for name in index_elements]
+    if connection.execute(update(model).where(*where).values(set_)).rowcount == 0:
+        connection.execute(insert(model).values(**values))
+    return True
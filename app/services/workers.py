@@ -0,0 +1,43 @@
+import threading
+
+
+class WorkerPool:
+    """Background threads that repeatedly run ``step`` until stopped.
+
+    ``step`` returns something truthy when it did work, in which case it is
+    called again straight away; otherwise the thread sleeps until ``wakeup``
+    is set or ``poll_seconds`` pass.
+    """
+
+    def __init__(self, name: str, size: int, step, wakeup: threading.Event, poll_seconds: float):
+        self.name = name
+        self.size = size
+        self.step = step
+        self.wakeup = wakeup
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self.wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.step():
+                    continue
+            except Exception as e:
+                print(f"❌ {self.name} error: {e}")
+            self.wakeup.wait(self.poll_seconds)
+            self.wakeup.clear()
@@ -0,0 +1,26 @@
+"""Import and startup timing.
+
+``app.main`` wraps its import groups and startup hooks in ``phase`` so a
+cold start can be broken down without a profiler. The breakdown is printed
+once the app has started and exported on ``/metrics``.
+"""
+import time
+from contextlib import contextmanager
+
+PROCESS_STARTED = time.perf_counter()
+
+phases: dict[str, float] = {}
+
+
+@contextmanager
+def phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def report() -> str:
+    parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in phases.items())
+    return f"🚀 Started in {(time.perf_counter() - PROCESS_STARTED) * 1000:.0f}ms ({parts})"
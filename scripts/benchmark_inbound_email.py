@@ -0,0 +1,181 @@
+"""Measure inbound email parse and ingest throughput.
+
+Generates synthetic emails in each format the registration platform sends
+(plain text, multipart, HTML-only and Bluesombrero order tables) with a
+range of registrant counts, runs them through ``parse_inbound_email`` and
+``ingest_registrations`` against an in-memory SQLite database, and prints
+JSON results so runs can be compared.
+
+    python scripts/benchmark_inbound_email.py --iterations 50 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+
+# Keep import-time chatter off stdout so the JSON report can be piped.
+with contextlib.redirect_stdout(sys.stderr):
+    from app.email import ingest_registrations, parse_inbound_email
+
+FORMATS = ["text", "multipart", "html", "order_table"]
+DIVISIONS = ["U4", "U6", "U8", "U10", "U12", "U14"]
+PROGRAMS = ["Fall Soccer", "Spring Soccer", "Winter Basketball", "Summer Baseball", "Fall Flag Football"]
+
+
+def _registrants(message_index: int, count: int) -> list[dict]:
+    return [
+        {
+            "name": f"Player {message_index}-{i}",
+            "program": PROGRAMS[(message_index + i) % len(PROGRAMS)],
+            # Spread players across teams so the jersey pool never runs out.
+            "division": f"{DIVISIONS[i % len(DIVISIONS)]} {chr(65 + message_index % 26)}{message_index // 26}",
+            "email": f"parent{message_index}@example.com",
+        }
+        for i in range(count)
+    ]
+
+
+def _text_body(registrants, order_number) -> str:
+    return "\n\n".join(
+        f"Name: {r['name']}\n"
+        f"Program: {r['program']}\n"
+        f"Division: {r['division']}\n"
+        f"Parent Email: {r['email']}\n"
+        f"Order Number: {order_number}\n"
+        f"Order Date: January 2, 2024"
+        for r in registrants
+    )
+
+
+def _html_body(registrants, order_number) -> str:
+    blocks = "<p></p>\n".join(
+        f"<p>Name: {r['name']}<br>\nProgram: {r['program']}<br>\nDivision: {r['division']}<br>\n"
+        f"Parent Email: {r['email']}<br>\nOrder Number: {order_number}<br>\nOrder Date: January 2, 2024</p>\n\n"
+        for r in registrants
+    )
+    return f"<html><body>\n{blocks}</body></html>"
+
+
+def _order_table_body(registrants, order_number) -> str:
+    rows = "\n".join(
+        f"<tr><td><span>{r['name']}</span></td><td><span>{r['program']} - {r['division']}</span></td></tr>"
+        for r in registrants
+    )
+    return (
+        "<html><body><table>\n"
+        "<tr><td>Order Details</td></tr>\n"
+        f"<tr><td>Order Number</td><td>{order_number}</td></tr>\n"
+        "<tr><td>Order Date</td><td>January 2, 2024</td></tr>\n"
+        f"{rows}\n"
+        "</table></body></html>"
+    )
+
+
+def generate_email(fmt: str, message_index: int, registrant_count: int) -> str:
+    """Return one synthetic raw email in the given format."""
+    registrants = _registrants(message_index, registrant_count)
+    order_number = f"BENCH{message_index:06d}"
+    if fmt == "text":
+        msg = MIMEText(_text_body(registrants, order_number), "plain")
+    elif fmt == "multipart":
+        msg = MIMEMultipart("alternative")
+        msg.attach(MIMEText(_text_body(registrants, order_number), "plain"))
+        msg.attach(MIMEText(_html_body(registrants, order_number), "html"))
+    elif fmt == "html":
+        msg = MIMEText(_html_body(registrants, order_number), "html")
+    elif fmt == "order_table":
+        msg = MIMEMultipart("alternative")
+        msg["To"] = registrants[0]["email"]
+        msg.attach(MIMEText(_order_table_body(registrants, order_number), "html"))
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+    msg["Subject"] = "Order Confirmation"
+    return msg.as_string()
+
+
+def run_case(fmt: str, registrant_count: int, iterations: int) -> dict:
+    """Parse and ingest ``iterations`` generated emails and report timings."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    corpus = [generate_email(fmt, i, registrant_count) for i in range(iterations)]
+
+    stages = {"mime": 0.0, "html": 0.0, "extract": 0.0, "db": 0.0}
+    parsed = 0
+    start = time.perf_counter()
+    # The parser reports progress with print(); keep it out of the results.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for raw in corpus:
+            regs = parse_inbound_email(raw, timings=stages)
+            parsed += len(regs)
+            db_start = time.perf_counter()
+            ingest_registrations(regs, db)
+            stages["db"] += time.perf_counter() - db_start
+    elapsed = time.perf_counter() - start
+    db.close()
+    engine.dispose()
+
+    expected = registrant_count * iterations
+    if parsed != expected:
+        raise RuntimeError(f"{fmt} x{registrant_count}: parsed {parsed} registrants, expected {expected}")
+
+    return {
+        "format": fmt,
+        "registrants": registrant_count,
+        "messages": iterations,
+        "bytes_per_message": sum(len(raw) for raw in corpus) // iterations,
+        "seconds": round(elapsed, 6),
+        "messages_per_second": round(iterations / elapsed, 2),
+        "registrants_per_second": round(parsed / elapsed, 2),
+        "stage_ms_per_message": {
+            name: round(seconds * 1000 / iterations, 4) for name, seconds in stages.items()
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma separated subset of %(default)s")
+    parser.add_argument("--registrants", default="1,5,10,50", help="registrant counts per email")
+    parser.add_argument("--iterations", type=int, default=20, help="emails per format and registrant count")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_case(fmt, int(count), args.iterations)
+        for fmt in args.formats.split(",")
+        for count in args.registrants.split(",")
+    ]
+    report = {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
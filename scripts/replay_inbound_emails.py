@@ -0,0 +1,202 @@
+"""Re-run archived inbound emails through the parser and ingest pipeline.
+
+Messages are read from the inbound email archive in arrival order and
+parsed in a pool of worker processes (one per core by default). A single
+writer in this process applies the parsed registrations in batches, one
+transaction per batch, in the same order the emails originally arrived.
+
+    python scripts/replay_inbound_emails.py --since 2024-08-01
+    python scripts/replay_inbound_emails.py --dry-run > replay.diff
+
+With ``--dry-run`` nothing is written; the changes the replay would make are
+printed as a diff instead. A throughput summary is printed to stderr.
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+with contextlib.redirect_stdout(sys.stderr):
+    from app.database import SessionLocal
+    from app.email import ingest_registrations, parse_inbound_email
+    from app.models import Player, Registration
+    from app.services.archive import ARCHIVE_DIR, EmailArchive
+    from app.services.identity import CandidateIndex, entry_key, resolve_players
+
+DIFF_FIELDS = ["division", "program", "order_number", "order_date"]
+
+
+def _init_worker() -> None:
+    # The parser reports progress with print(); keep workers quiet.
+    sys.stdout = open(os.devnull, "w")
+
+
+def _parse_chunk(chunk: list[tuple[int, str]]) -> list[tuple[int, list[dict] | None, str | None]]:
+    results = []
+    for seq, raw in chunk:
+        try:
+            results.append((seq, parse_inbound_email(raw), None))
+        except Exception as e:
+            results.append((seq, None, repr(e)))
+    return results
+
+
+def parse_messages(messages, workers: int, chunk_size: int):
+    """Parse ``(seq, raw)`` pairs in a process pool, yielding results in order.
+
+    Only a bounded number of chunks are in flight, so memory stays flat no
+    matter how large the archive is.
+    """
+    messages = iter(messages)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        while True:
+            chunk = list(islice(messages, chunk_size))
+            if chunk:
+                pending.append(pool.submit(_parse_chunk, chunk))
+            if pending and (not chunk or len(pending) >= workers * 2):
+                yield from pending.popleft().result()
+            elif not chunk:
+                return
+
+
+def _batches(results, batch_size: int):
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ReplayDiff:
+    """Work out what ingesting parsed registrations would change, without writing.
+
+    State carries across batches so a player introduced by an earlier email
+    is treated as existing by later ones, exactly as a real replay would.
+    """
+
+    def __init__(self, db, out=None):
+        self.db = db
+        self.out = out if out is not None else sys.stdout
+        self.players = {}
+        self.regs = {}
+        self.changes = 0
+
+    def _load(self, keys: set[str]) -> None:
+        keys = keys - self.players.keys()
+        if not keys:
+            return
+        found = {row.id: key for key, row in resolve_players(self.db, keys, [Player.id]).items()}
+        existing = set(found.values())
+        for key in keys:
+            self.players[key] = key in existing
+        if found:
+            for reg in self.db.query(Registration).filter(Registration.player_id.in_(found)):
+                self.regs[(found[reg.player_id], reg.sport, reg.season)] = {
+                    field: getattr(reg, field) for field in DIFF_FIELDS
+                }
+
+    def _emit(self, line: str) -> None:
+        self.changes += 1
+        print(line, file=self.out)
+
+    def apply(self, seq: int, parsed_regs: list[dict]) -> None:
+        self._load({entry_key(entry) for entry in parsed_regs})
+        for entry in parsed_regs:
+            name = entry["full_name"]
+            player_key = entry_key(entry)
+            if not self.players[player_key]:
+                self.players[player_key] = True
+                self._emit(f"#{seq} + player {name} <{entry['parent_email']}>")
+            key = (player_key, entry["sport"], entry["season"])
+            new = {field: entry[field] for field in DIFF_FIELDS}
+            old = self.regs.get(key)
+            if old is None:
+                self._emit(f"#{seq} + registration {name} {entry['sport']} {entry['season']} {entry['division']}")
+            else:
+                for field in DIFF_FIELDS:
+                    if old[field] != new[field]:
+                        self._emit(
+                            f"#{seq} ~ registration {name} {entry['sport']} {entry['season']} "
+                            f"{field}: {old[field]!r} -> {new[field]!r}"
+                        )
+            self.regs[key] = new
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="archive directory (default: %(default)s)")
+    parser.add_argument("--since", type=_parse_time, help="only messages received at or after this ISO time")
+    parser.add_argument("--until", type=_parse_time, help="only messages received before this ISO time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parser processes (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=20, help="messages sent to a worker at a time")
+    parser.add_argument("--batch-size", type=int, default=200, help="messages written per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="print the changes instead of writing them")
+    parser.add_argument(
+        "--near-duplicates", action="store_true", help="warn about new players that look like existing ones"
+    )
+    args = parser.parse_args(argv)
+
+    archive = EmailArchive(args.archive)
+    messages = ((entry["seq"], raw) for entry, raw in archive.iter_messages(args.since, args.until))
+
+    db = SessionLocal()
+    diff = ReplayDiff(db) if args.dry_run else None
+    candidates = CandidateIndex.load(db) if args.near_duplicates else None
+    counts = {"messages": 0, "registrants": 0, "errors": 0}
+    write_seconds = 0.0
+    start = time.perf_counter()
+    try:
+        results = parse_messages(messages, args.workers, args.chunk_size)
+        for batch in _batches(results, args.batch_size):
+            batch_regs = []
+            for seq, regs, error in batch:
+                counts["messages"] += 1
+                if error is not None:
+                    counts["errors"] += 1
+                    print(f"❌ Message #{seq} failed to parse: {error}", file=sys.stderr)
+                    continue
+                counts["registrants"] += len(regs)
+                if diff is not None:
+                    diff.apply(seq, regs)
+                else:
+                    batch_regs.extend(regs)
+
+            write_start = time.perf_counter()
+            if batch_regs:
+                with contextlib.redirect_stdout(sys.stderr):
+                    ingest_registrations(batch_regs, db, candidates=candidates)
+            write_seconds += time.perf_counter() - write_start
+            print(f"… {counts['messages']} messages replayed", file=sys.stderr)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    rate = counts["messages"] / elapsed if elapsed else 0.0
+    summary = (
+        f"Replayed {counts['messages']} messages ({counts['registrants']} registrants, "
+        f"{counts['errors']} errors) in {elapsed:.2f}s: {rate:.1f} msg/s with {args.workers} workers, "
+        f"{write_seconds:.2f}s writing"
+    )
+    if diff is not None:
+        summary += f", {diff.changes} changes (dry run)"
+    print(summary, file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
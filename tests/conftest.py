@@ -0,0 +1,101 @@
+import asyncio
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from fastapi.testclient import TestClient
+
+from app.database import Base
+from app.auth import create_user
+from app.main import app, get_async_db, get_db
+
+import pytest
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(engine, db_session):
+    """Test client logged in as an admin, with requests using ``engine``."""
+    Session = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    create_user(db_session, 'admin@example.com', 'admin')
+    client = TestClient(app)
+    client.post('/login', data={'email': 'admin@example.com', 'password': 'admin'}, follow_redirects=False)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'jerseys.db'
+
+
+@pytest.fixture
+def session_factory(db_path):
+    engine = create_engine(f'sqlite:///{db_path}', connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def async_client(session_factory, db_path):
+    """Logged-in test client that also serves the ``async def`` routes.
+
+    The sync and async sessions share a database file, since an in-memory
+    database cannot be shared between the two drivers.
+    """
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{db_path}')
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = session_factory()
+    create_user(db, 'admin@example.com', 'admin')
+    db.close()
+    client = TestClient(app)
+    client.post('/login', data={'email': 'admin@example.com', 'password': 'admin'}, follow_redirects=False)
+    yield client
+    app.dependency_overrides.clear()
+    asyncio.run(async_engine.dispose())
@@ -0,0 +1,53 @@
+"""Minimal local stand-in for the SendGrid v3 mail/send API."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SendGridStub:
+    """Record mail/send requests and answer them like SendGrid would.
+
+    Set ``fail_next`` to make the following requests return that status code.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.fail_next = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.connections.add(self.client_address)
+                status = stub.fail_next.pop(0) if stub.fail_next else 202
+                stub.requests.append({
+                    "path": self.path,
+                    "authorization": self.headers.get("Authorization"),
+                    "json": json.loads(body),
+                    "status": status,
+                })
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def personalizations(self):
+        return [p for r in self.requests if r["status"] < 300 for p in r["json"]["personalizations"]]
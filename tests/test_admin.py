@@ -0,0 +1,102 @@
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.database import Base
+from app.models import Player, Registration
+
+
+def add_players(db, count, division='U8', sport='soccer'):
+    for i in range(count):
+        player = Player(
+            full_name=f'{sport} {division} {i}',
+            parent_email='' if i % 3 == 0 else f'p{i}@example.com',
+            jersey_number=None if i % 4 == 0 else i,
+        )
+        db.add(player)
+        db.flush()
+        db.add(Registration(player_id=player.id, program=f'Fall {sport}', division=division, sport=sport, season='fall'))
+    db.commit()
+
+
+def count_queries(engine, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+
+def test_admin_dashboard_counts(client, db_session):
+    add_players(db_session, 6)
+    add_players(db_session, 2, division='U10', sport='basketball')
+
+    response = client.get('/admin')
+    assert response.status_code == 200
+    assert response.context['total_players'] == 8
+    assert response.context['missing_emails'] == 3
+    assert response.context['missing_jerseys'] == 3
+    assert response.context['divisions_by_sport'] == {'soccer': ['U8'], 'basketball': ['U10']}
+    assert 'soccer U8 1' not in response.text
+
+
+def test_admin_roster_fragment(client, db_session):
+    add_players(db_session, 3)
+    add_players(db_session, 2, division='U10', sport='basketball')
+
+    response = client.get('/admin/roster/soccer/U8')
+    assert response.status_code == 200
+    assert [row.full_name for row in response.context['players']] == ['soccer U8 0', 'soccer U8 1', 'soccer U8 2']
+    assert 'data-division="U8"' in response.text
+    assert '<html' not in response.text
+
+    assert client.get('/admin/roster/basketball/U8').context['players'] == []
+
+
+def test_admin_dashboard_query_count_is_constant(client, engine, db_session):
+    add_players(db_session, 2)
+    _, small = count_queries(engine, lambda: client.get('/admin'))
+
+    add_players(db_session, 30, division='U10')
+    _, large = count_queries(engine, lambda: client.get('/admin'))
+
+    assert small == large
+    # The data version check, the counters and the sport/division pairs.
+    assert large <= 3
+
+    _, roster_queries = count_queries(engine, lambda: client.get('/admin/roster/soccer/U10'))
+    assert roster_queries == 2
+
+
+def test_dashboard_reads_from_replica_until_user_writes(client, db_session, monkeypatch):
+    replica = create_engine(
+        'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(replica)
+    replica_session = sessionmaker(bind=replica)()
+    add_players(replica_session, 5)
+    replica_session.close()
+    monkeypatch.setattr('app.main.ReadSessionLocal', sessionmaker(bind=replica))
+
+    add_players(db_session, 3)
+    assert len(client.get('/admin/roster/soccer/U8').context['players']) == 5
+
+    # Right after an edit the user reads their own write from the primary.
+    player_ids = [player_id for (player_id,) in db_session.query(Player.id)]
+    assert client.delete(f'/players/{player_ids[0]}').status_code == 200
+    assert len(client.get('/admin/roster/soccer/U8').context['players']) == 2
+
+    # Once the window has passed reads go back to the replica.
+    monkeypatch.setattr('app.main.READ_YOUR_WRITES_SECONDS', -1)
+    assert client.delete(f'/players/{player_ids[1]}').status_code == 200
+    assert len(client.get('/admin/roster/soccer/U8').context['players']) == 5
@@ -0,0 +1,93 @@
+import gzip
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app.services.archive import EmailArchive
+
+import pytest
+
+
+def make_email(n, order_number=None):
+    body = f"Order Number: {order_number}\n" if order_number else ""
+    return (
+        f"Message-ID: <msg-{n}@example.com>\n"
+        "Subject: Registration\n\n"
+        f"{body}Name: Player {n}\nProgram: Fall 2024 Soccer\nDivision: U8\nParent Email: p{n}@example.com\n"
+    )
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return EmailArchive(str(tmp_path))
+
+
+def test_append_and_read_back(archive):
+    first = archive.append(make_email(1, order_number="1001"))
+    second = archive.append(make_email(2))
+
+    assert (first["seq"], second["seq"]) == (1, 2)
+    assert first["message_id"] == "<msg-1@example.com>"
+    assert first["order_number"] == "1001"
+    assert second["order_number"] is None
+    assert archive.get(2) == make_email(2)
+    assert archive.read(archive.find(order_number="1001")[0]) == make_email(1, order_number="1001")
+    assert archive.find(message_id="<msg-2@example.com>")[0]["seq"] == 2
+
+    # A segment is an ordinary gzip file holding every message in order.
+    with gzip.open(os.path.join(archive.directory, first["segment"]), "rt") as f:
+        assert f.read() == make_email(1, order_number="1001") + make_email(2)
+
+
+def test_segments_rotate_by_size_and_time(tmp_path):
+    archive = EmailArchive(str(tmp_path), segment_max_bytes=300)
+    start = datetime(2024, 9, 1, 12, 0, 0)
+    for n in range(6):
+        archive.append(make_email(n), received_at=start)
+    assert len(archive.segments()) > 1
+
+    by_time = EmailArchive(str(tmp_path / "time"), segment_max_seconds=60)
+    by_time.append(make_email(1), received_at=start)
+    by_time.append(make_email(2), received_at=start + timedelta(seconds=30))
+    by_time.append(make_email(3), received_at=start + timedelta(seconds=90))
+    assert len(by_time.segments()) == 2
+
+    entries = list(archive.iter_messages())
+    assert [raw for _, raw in entries] == [make_email(n) for n in range(6)]
+    assert [e["seq"] for e, _ in by_time.iter_messages(since=start + timedelta(seconds=30))] == [2, 3]
+
+
+def test_concurrent_appends_keep_every_message(archive):
+    def worker(offset):
+        for n in range(25):
+            archive.append(make_email(offset + n))
+
+    threads = [threading.Thread(target=worker, args=(i * 100,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    entries = list(archive.entries())
+    assert [e["seq"] for e in entries] == list(range(1, 101))
+    assert sorted(raw for _, raw in archive.iter_messages()) == sorted(
+        make_email(i * 100 + n) for i in range(4) for n in range(25)
+    )
+
+
+def test_unindexed_and_torn_writes_are_recovered(archive):
+    entry = archive.append(make_email(1))
+    segment = os.path.join(archive.directory, entry["segment"])
+
+    # Simulate a crash after the segment write but before the index write,
+    # followed by a torn write.
+    other = EmailArchive(str(archive.directory + "-other"))
+    lost = other.append(make_email(2))
+    with open(os.path.join(other.directory, lost["segment"]), "rb") as f:
+        member = f.read()
+    with open(segment, "ab") as f:
+        f.write(member)
+        f.write(member[:10])
+
+    archive.append(make_email(3))
+    assert [raw for _, raw in archive.iter_messages()] == [make_email(1), make_email(2), make_email(3)]
@@ -6,8 +6,10 @@ from sqlalchemy.orm import sessionmaker
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 
 from app.database import Base
-from app.models import Player, Registration
-from app.services.assign import assign_jersey_number
+from app.models import JerseyAllocation, Player, Registration
+from app.services.assign import (
+    JerseyAllocator, JerseyNumberTaken, JerseyPoolExhausted, assign_jersey_number, change_jersey_number,
+)
 
 import pytest
 
@@ -38,7 +40,7 @@ def test_assign_returns_lowest_unused(db_session):
     db_session.commit()
     assert assign_jersey_number(db_session, 'U8') == 3
 
-def test_assign_fallback_when_all_taken(db_session):
+def test_assign_raises_when_pool_exhausted(db_session):
     for num in range(1, 100):
         player = Player(full_name=f'Player {num}', jersey_number=num, parent_email=f'p{num}@ex.com')
         db_session.add(player)
@@ -52,4 +54,106 @@ def test_assign_fallback_when_all_taken(db_session):
         )
         db_session.add(reg)
     db_session.commit()
-    assert assign_jersey_number(db_session, 'U8') == 99
+    with pytest.raises(JerseyPoolExhausted):
+        assign_jersey_number(db_session, 'U8')
+
+def test_allocator_hands_out_batches_without_reuse(db_session):
+    for num in [1, 3]:
+        player = Player(full_name=f'Player {num}', jersey_number=num, parent_email='p@example.com')
+        db_session.add(player)
+        db_session.flush()
+        db_session.add(Registration(player_id=player.id, program='prog', division='U10', sport='sport', season='2024'))
+    db_session.commit()
+
+    allocator = JerseyAllocator(db_session)
+    assert allocator.allocate('U10', 3) == [2, 4, 5]
+    assert allocator.allocate('U10') == [6]
+    assert allocator.allocate('U12', 2) == [1, 2]
+    with pytest.raises(JerseyPoolExhausted):
+        allocator.allocate('U12', 98)
+    assert allocator.allocate('U12') == [3]
+
+
+def test_batch_that_loses_races_reserves_nothing(db_session):
+    allocator = JerseyAllocator(db_session)
+    allocator.load(['U8'])
+    # Another worker takes the top half after this allocator loaded the division.
+    db_session.add_all(JerseyAllocation(division='U8', season='', number=n) for n in range(50, 100))
+    db_session.flush()
+
+    with pytest.raises(JerseyPoolExhausted):
+        allocator.allocate('U8', 60)
+    assert db_session.query(JerseyAllocation).filter(JerseyAllocation.number < 50).count() == 0
+    assert allocator.allocate('U8', 49) == list(range(1, 50))
+
+
+def test_parallel_allocations_never_duplicate(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.models import JerseyAllocation
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'alloc.db'}", connect_args={'timeout': 30})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    def register(i):
+        session = Session()
+        try:
+            player = Player(full_name=f'Racer {i}', parent_email='p@example.com')
+            session.add(player)
+            session.flush()
+            player.jersey_number = assign_jersey_number(session, 'U10', season='fall', player_id=player.id)
+            session.add(Registration(player_id=player.id, program='Fall Soccer', division='U10', sport='soccer', season='fall'))
+            session.commit()
+            return player.jersey_number
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numbers = list(pool.map(register, range(40)))
+
+    assert sorted(numbers) == list(range(1, 41))
+    session = Session()
+    assert session.query(JerseyAllocation).count() == 40
+    session.close()
+
+
+def test_change_jersey_number_moves_the_reservation(db_session):
+    allocator = JerseyAllocator(db_session)
+    players = []
+    for name in ('Amy Adams', 'Ben Brown'):
+        player = Player(full_name=name, parent_email='p@example.com')
+        db_session.add(player)
+        db_session.flush()
+        db_session.add(Registration(player_id=player.id, program='prog', division='U8', sport='soccer', season='fall'))
+        player.jersey_number = allocator.allocate('U8', season='fall', player_ids=[player.id])[0]
+        players.append(player)
+    db_session.commit()
+    amy, ben = players
+
+    with pytest.raises(JerseyNumberTaken):
+        change_jersey_number(db_session, amy, ben.jersey_number)
+    assert amy.jersey_number == 1
+
+    change_jersey_number(db_session, amy, 10)
+    db_session.commit()
+    reserved = {(a.number, a.player_id) for a in db_session.query(JerseyAllocation)}
+    assert reserved == {(10, amy.id), (2, ben.id)}
+    assert assign_jersey_number(db_session, 'U8', season='fall') == 1
+
+
+def test_put_player_reserves_the_new_number(async_client, session_factory):
+    db = session_factory()
+    for name in ('Amy Adams', 'Ben Brown'):
+        player = Player(full_name=name, parent_email='p@example.com')
+        db.add(player)
+        db.flush()
+        db.add(Registration(player_id=player.id, program='prog', division='U8', sport='soccer', season='fall'))
+        player.jersey_number = assign_jersey_number(db, 'U8', season='fall', player_id=player.id)
+    db.commit()
+
+    update = {'full_name': 'Amy Adams', 'parent_email': 'p@example.com'}
+    assert async_client.put('/players/1', json={**update, 'jersey_number': 2}).status_code == 409
+    assert async_client.put('/players/1', json={**update, 'jersey_number': 7}).status_code == 200
+    db.expire_all()
+    assert {(a.number, a.player_id) for a in db.query(JerseyAllocation)} == {(7, 1), (2, 2)}
+    db.close()
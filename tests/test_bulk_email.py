@@ -0,0 +1,148 @@
+import os
+import time
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import EmailOutbox, Player, Registration
+from app.services import mailer, outbox
+from app.services.outbox import process_outbox_batch
+from tests.sendgrid_stub import SendGridStub
+
+import pytest
+
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    with SendGridStub() as stub:
+        monkeypatch.setattr(mailer, 'SENDGRID_API_URL', stub.url)
+        monkeypatch.setattr(mailer, 'SENDGRID_API_KEY', 'test-key')
+        monkeypatch.setattr(mailer, 'MAX_PERSONALIZATIONS', 10)
+        mailer.close_http_client()
+        yield stub
+        mailer.close_http_client()
+
+
+def add_registrations(db, count, division='U8'):
+    for i in range(count):
+        player = Player(full_name=f'{division} Player {i}', parent_email=f'{division}{i}@example.com', jersey_number=i + 1)
+        db.add(player)
+        db.flush()
+        db.add(Registration(player_id=player.id, program='Fall Soccer', division=division, sport='soccer', season='fall'))
+    db.commit()
+
+
+def drain(db_session):
+    Session = sessionmaker(bind=db_session.get_bind())
+    while process_outbox_batch(Session):
+        pass
+
+
+def test_send_bulk_queues_and_sender_batches(client, db_session, sendgrid):
+    add_registrations(db_session, 25)
+    add_registrations(db_session, 3, division='U10')
+
+    response = client.post('/registrations/send_bulk', json={'sport': 'Soccer', 'season': 'fall', 'division': 'U8'})
+    assert response.status_code == 202
+    assert response.json()['queued'] == 25
+    assert sendgrid.requests == []
+
+    # Queuing again before delivery does not duplicate messages.
+    again = client.post('/registrations/send_bulk', json={'sport': 'soccer', 'season': 'fall', 'division': 'U8'})
+    assert again.json()['queued'] == 0
+
+    drain(db_session)
+    assert len(sendgrid.requests) == 3
+    assert all(r['authorization'] == 'Bearer test-key' for r in sendgrid.requests)
+    assert len(sendgrid.connections) == 1
+    first = sendgrid.personalizations[0]
+    assert first['to'] == [{'email': 'U80@example.com'}]
+    assert first['substitutions']['-jersey_number-'] == '1'
+
+    db_session.expire_all()
+    flags = {r.division: set() for r in db_session.query(Registration)}
+    for reg in db_session.query(Registration):
+        flags[reg.division].add(reg.confirmation_sent)
+    assert flags == {'U8': {True}, 'U10': {False}}
+    assert {m.status for m in db_session.query(EmailOutbox)} == {outbox.OUTBOX_SENT}
+
+    # Already confirmed registrations are skipped unless resend is requested.
+    skipped = client.post('/registrations/send_bulk', json={'sport': 'soccer', 'season': 'fall', 'division': 'U8'})
+    assert skipped.json()['queued'] == 0
+
+
+def test_one_request_carries_up_to_sendgrids_limit(client, db_session, sendgrid, monkeypatch):
+    monkeypatch.setattr(mailer, 'MAX_PERSONALIZATIONS', 1000)
+    add_registrations(db_session, 250)
+    client.post('/registrations/send_bulk', json={'sport': 'soccer', 'season': 'fall', 'division': 'U8'})
+
+    bucket = outbox.TokenBucket(outbox.RATE_PER_SECOND, outbox.RATE_BURST)
+    assert process_outbox_batch(sessionmaker(bind=db_session.get_bind()), bucket) == 250
+    assert len(sendgrid.requests) == 1
+    assert len(sendgrid.personalizations) == 250
+
+
+def test_substitutions_are_html_escaped():
+    payload = mailer.build_confirmation_payload([
+        {'to_email': 'p@example.com', 'player_name': '<b>Amy</b> & "Co"', 'jersey_number': 7},
+    ])
+    substitutions = payload['personalizations'][0]['substitutions']
+    assert substitutions['-player_name-'] == '&lt;b&gt;Amy&lt;/b&gt; &amp; &quot;Co&quot;'
+    assert substitutions['-jersey_number-'] == '7'
+
+
+def test_failed_batch_is_retried_with_backoff(client, db_session, sendgrid, monkeypatch):
+    add_registrations(db_session, 15)
+    sendgrid.fail_next = [202, 500]
+
+    ids = [reg.id for reg in db_session.query(Registration)]
+    assert client.post('/registrations/send_bulk', json={'registration_ids': ids}).json()['queued'] == 15
+    drain(db_session)
+
+    db_session.expire_all()
+    sent = [reg.confirmation_sent for reg in db_session.query(Registration).order_by(Registration.id)]
+    assert sent == [True] * 10 + [False] * 5
+    retrying = db_session.query(EmailOutbox).filter(EmailOutbox.status == outbox.OUTBOX_PENDING).all()
+    assert len(retrying) == 5
+    assert all(m.attempts == 1 and m.next_attempt_at > datetime.utcnow() for m in retrying)
+
+    # Once the backoff has passed the messages go out on the next attempt.
+    for message in retrying:
+        message.next_attempt_at = datetime.utcnow()
+    db_session.commit()
+    drain(db_session)
+    db_session.expire_all()
+    assert all(reg.confirmation_sent for reg in db_session.query(Registration))
+
+
+def test_message_fails_after_max_attempts(client, db_session, sendgrid, monkeypatch):
+    monkeypatch.setattr(outbox, 'MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(outbox, 'BACKOFF_SECONDS', 0)
+    add_registrations(db_session, 1)
+    sendgrid.fail_next = [500, 500]
+
+    reg = db_session.query(Registration).one()
+    response = client.post(f'/registrations/{reg.id}/send_email')
+    assert response.status_code == 202
+    drain(db_session)
+
+    db_session.expire_all()
+    message = db_session.query(EmailOutbox).one()
+    assert message.status == outbox.OUTBOX_FAILED
+    assert message.attempts == 2
+    assert len(sendgrid.requests) == 2
+    assert not db_session.get(Registration, reg.id).confirmation_sent
+
+
+def test_token_bucket_limits_rate():
+    bucket = outbox.TokenBucket(rate=100, capacity=5)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire(5)
+    assert time.monotonic() - start >= 0.09
+
+
+def test_send_bulk_requires_a_selection(client):
+    assert client.post('/registrations/send_bulk', json={'sport': 'soccer'}).status_code == 400
@@ -0,0 +1,143 @@
+import io
+import os
+import subprocess
+import sys
+from datetime import datetime
+from sqlalchemy import event
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import Player, Registration
+from app.services import data_version
+from app.services.roster_import import import_roster
+
+import pytest
+
+
+def add_player(db, name='Amy Adams'):
+    player = Player(full_name=name, parent_email=f'{name.split()[0].lower()}@example.com')
+    db.add(player)
+    db.flush()
+    db.add(Registration(player_id=player.id, program='Fall Soccer', division='U8', sport='soccer', season='fall'))
+    db.commit()
+    return player
+
+
+def version(db):
+    db.expire_all()
+    return data_version.current(db)[0]
+
+
+def test_writes_bump_the_version(db_session):
+    assert version(db_session) == 0
+    player = add_player(db_session)
+    assert version(db_session) > 0
+
+    before = version(db_session)
+    player.jersey_number = 7
+    db_session.commit()
+    assert version(db_session) == before + 1
+
+    # Bulk statements bump it too.
+    db_session.query(Registration).update({Registration.confirmation_sent: True}, synchronize_session=False)
+    db_session.commit()
+    assert version(db_session) == before + 2
+    import_roster(io.BytesIO(b'Name,Parent Email,Division,Sport,Season\nBen Brown,ben@example.com,U8,soccer,fall\n'), db_session)
+    assert version(db_session) > before + 2
+
+    before = version(db_session)
+    db_session.add(Player(full_name='Cal Cole', parent_email='cal@example.com'))
+    db_session.flush()
+    db_session.rollback()
+    assert version(db_session) == before
+
+
+def test_version_row_is_written_once_at_commit(db_session, engine):
+    player = add_player(db_session)
+    before = version(db_session)
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        player.jersey_number = 7
+        db_session.flush()
+        db_session.add(Player(full_name='Ben Brown', parent_email='ben@example.com'))
+        db_session.flush()
+        assert not any('data_version' in s for s in statements)
+        db_session.commit()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert sum('data_version' in s for s in statements) == 1
+    assert version(db_session) == before + 1
+
+    # Setting an attribute to the value it already has is not a write.
+    player.full_name = player.full_name
+    db_session.commit()
+    assert version(db_session) == before + 1
+
+
+@pytest.mark.parametrize('path', ['/admin', '/export', '/admin/roster/soccer/U8', '/players', '/registrations'])
+def test_conditional_get(client, db_session, engine, path):
+    add_player(db_session)
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        cached = client.get(path, headers={'If-None-Match': etag})
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert cached.status_code == 304
+    assert cached.headers['etag'] == etag
+    assert cached.content == b''
+    assert all('players' not in s and 'registrations' not in s for s in statements)
+
+    add_player(db_session, 'Ben Brown')
+    fresh = client.get(path, headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['etag'] != etag
+
+
+def test_write_in_the_same_second_as_a_read_is_not_a_304(client, db_session, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2024, 8, 1, 12, 0, 0, 250000)
+
+    monkeypatch.setattr(data_version, 'datetime', FrozenDatetime)
+    add_player(db_session)
+    first = client.get('/players')
+    add_player(db_session, 'Ben Brown')
+
+    second = client.get('/players', headers={'If-Modified-Since': first.headers['last-modified']})
+    assert second.headers['last-modified'] == first.headers['last-modified']
+    assert second.status_code == 200
+    assert 'Ben Brown' in second.text
+
+
+def test_models_alone_bump_the_version(tmp_path):
+    # A writer that imports nothing but the models (a one-off script, say).
+    code = (
+        "from app.database import Base, SessionLocal, engine\n"
+        "from app.models import DataVersion, Player\n"
+        "Base.metadata.create_all(engine)\n"
+        "db = SessionLocal()\n"
+        "db.add(Player(full_name='Amy Adams', parent_email='amy@example.com'))\n"
+        "db.commit()\n"
+        "print(db.query(DataVersion.version).scalar())\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'app.db'}"}
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == '1'
@@ -136,3 +136,96 @@ def test_update_division_for_existing_player(db_session):
     reg_updated = db_session.query(Registration).filter_by(player_id=player.id, sport='soccer', season='spring').first()
     assert reg_updated.division == 'U12'
     assert db_session.query(Registration).count() == 1
+
+
+def test_family_order_is_ingested_in_one_transaction(db_session):
+    from sqlalchemy import event
+
+    existing = Player(full_name='Kid 0', parent_email='parent@example.com', jersey_number=1)
+    db_session.add(existing)
+    db_session.flush()
+    db_session.add(Registration(player_id=existing.id, program='Fall Soccer', division='U8', sport='soccer', season='fall'))
+    db_session.commit()
+
+    body = "\n\n".join(
+        f"Name: Kid {i}\nProgram: Fall Soccer\nDivision: U8\nParent Email: parent@example.com"
+        for i in range(5)
+    )
+
+    commits = []
+    event.listen(db_session, 'after_commit', lambda session: commits.append(session))
+    process_inbound_email(body, db_session)
+
+    assert len(commits) == 1
+    players = db_session.query(Player).order_by(Player.full_name).all()
+    assert [p.jersey_number for p in players] == [1, 2, 3, 4, 5]
+    assert db_session.query(Registration).count() == 5
+
+
+def test_order_table_email_is_parsed_into_one_tree(db_session, monkeypatch):
+    import bs4
+
+    built = []
+    original = bs4.BeautifulSoup
+
+    class CountingSoup(original):
+        def __init__(self, *args, **kwargs):
+            built.append(args[0])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(bs4, 'BeautifulSoup', CountingSoup)
+
+    msg = MIMEMultipart('alternative')
+    msg['To'] = 'parent@example.com'
+    msg.attach(MIMEText("""
+    <table>
+        <tr><td>Order Details</td></tr>
+        <tr><td><span>John Doe</span></td><td><span>Fall Soccer - U10</span></td></tr>
+        <tr><td>Order Number</td><td>XYZ9</td></tr>
+    </table>
+    """, 'html'))
+
+    process_inbound_email(msg.as_string(), db_session)
+
+    assert len(built) == 1
+    reg = db_session.query(Registration).one()
+    assert (reg.division, reg.order_number) == ('U10', 'XYZ9')
+
+
+def test_resent_email_is_skipped_before_parsing(db_session, monkeypatch):
+    from app.models import InboundMessage
+
+    msg = MIMEMultipart('alternative')
+    msg['Message-ID'] = '<order-77@example.com>'
+    msg.attach(MIMEText("Name: John Doe\nProgram: Fall Soccer\nDivision: U10\nParent Email: parent@example.com\nOrder Number: 77", 'plain'))
+    raw = msg.as_string()
+
+    assert process_inbound_email(raw, db_session) is True
+
+    def fail(*args, **kwargs):
+        raise AssertionError('resend was parsed')
+
+    monkeypatch.setattr('app.email.parse_inbound_email', fail)
+    # Same message again, and a resend with new transport headers and a new MIME boundary.
+    resend = raw.replace(msg.get_boundary(), 'new-boundary').replace('<order-77@example.com>', '<resend@example.com>')
+    assert process_inbound_email(raw, db_session) is False
+    assert process_inbound_email('Received: by relay\n' + resend, db_session) is False
+
+    message = db_session.query(InboundMessage).one()
+    assert (message.message_id, message.order_number, message.registrant_count) == ('<order-77@example.com>', '77', 1)
+    assert message.duplicate_count == 2
+    assert db_session.query(Registration).count() == 1
+
+
+def test_unchanged_registration_is_not_rewritten(db_session):
+    from sqlalchemy import event
+
+    body = "Name: John Doe\nProgram: Fall Soccer\nDivision: U10\nParent Email: parent@example.com\nOrder Number: 1"
+    process_inbound_email(body, db_session)
+
+    updates = []
+    event.listen(db_session.get_bind(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: updates.append(statement) if statement.startswith('UPDATE registrations') else None)
+    # A different email (new order details) carrying the same registration data.
+    process_inbound_email(body.replace('Order Number: 1', 'Order Number: 1\nNote: resent by parent'), db_session)
+    assert updates == []
@@ -0,0 +1,102 @@
+import os
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import Player, InboundEmailJob
+from app.services import email_queue
+from app.services.email_queue import enqueue_inbound_email, process_next_job
+
+BODY = """
+Name: John Doe
+Program: Fall Soccer
+Division: U10
+Parent Email: parent@example.com
+"""
+
+
+def test_job_is_processed_by_worker(session_factory):
+    db = session_factory()
+    job = enqueue_inbound_email(BODY, db)
+    assert job.status == 'pending'
+
+    assert process_next_job(session_factory) is True
+    assert process_next_job(session_factory) is False
+
+    db.expire_all()
+    assert db.get(InboundEmailJob, job.id).status == 'done'
+    assert db.query(Player).filter_by(full_name='John Doe').count() == 1
+
+
+def test_failing_job_is_retried_then_dead_lettered(session_factory, monkeypatch):
+    def explode(email_body, db):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr('app.email.process_inbound_email', explode)
+    monkeypatch.setattr(email_queue, 'RETRY_DELAY_SECONDS', 0)
+    monkeypatch.setattr(email_queue, 'MAX_ATTEMPTS', 2)
+
+    db = session_factory()
+    job = enqueue_inbound_email(BODY, db)
+
+    assert process_next_job(session_factory) is True
+    db.expire_all()
+    job = db.get(InboundEmailJob, job.id)
+    assert job.status == 'pending'
+    assert job.attempts == 1
+    assert 'database unavailable' in job.last_error
+
+    assert process_next_job(session_factory) is True
+    db.expire_all()
+    job = db.get(InboundEmailJob, job.id)
+    assert job.status == 'dead'
+    assert job.attempts == 2
+    assert process_next_job(session_factory) is False
+
+
+def test_receive_email_returns_202_and_job_status(async_client, monkeypatch):
+    monkeypatch.setattr('app.main.save_inbound_email', lambda email_body: None)
+    response = async_client.post('/email/receive', data={'email': BODY})
+    assert response.status_code == 202
+    job_id = response.json()['job_id']
+
+    status = async_client.get(f'/email/jobs/{job_id}')
+    assert status.status_code == 200
+    assert status.json()['status'] == 'pending'
+
+    assert async_client.get('/email/jobs/9999').status_code == 404
+
+
+def test_receive_email_drops_resend_of_processed_email(async_client, session_factory, monkeypatch):
+    saved = []
+    monkeypatch.setattr('app.main.save_inbound_email', saved.append)
+    assert async_client.post('/email/receive', data={'email': BODY}).status_code == 202
+    assert process_next_job(session_factory) is True
+
+    response = async_client.post('/email/receive', data={'email': BODY})
+    assert response.status_code == 200
+    assert response.json()['duplicate'] is True
+    assert len(saved) == 1
+
+    db = session_factory()
+    assert db.query(InboundEmailJob).count() == 1
+    db.close()
+
+
+def test_update_player_uses_async_session(async_client, session_factory):
+    db = session_factory()
+    player = Player(full_name='John Doe', parent_email='old@example.com', jersey_number=4)
+    db.add(player)
+    db.commit()
+
+    response = async_client.put(
+        f'/players/{player.id}',
+        json={'full_name': 'John Doe', 'parent_email': 'new@example.com', 'jersey_number': 9},
+    )
+    assert response.status_code == 200
+    assert response.json()['jersey_number'] == 9
+    db.expire_all()
+    assert db.get(Player, player.id).parent_email == 'new@example.com'
+    db.close()
+
+    assert async_client.put('/players/9999', json={'full_name': 'X', 'parent_email': 'x@example.com', 'jersey_number': 1}).status_code == 404
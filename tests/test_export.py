@@ -0,0 +1,77 @@
+import csv
+import gzip
+import io
+import os
+from datetime import datetime
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import Player, Registration
+from app.services import export
+
+import pytest
+
+
+@pytest.fixture
+def roster(db_session):
+    for i in range(50):
+        player = Player(full_name=f'Player {i}', parent_email=f'p{i}@example.com', jersey_number=i + 1)
+        db_session.add(player)
+        db_session.flush()
+        db_session.add(Registration(
+            player_id=player.id,
+            program='Fall Soccer' if i % 2 else 'Spring Basketball',
+            sport='soccer' if i % 2 else 'basketball',
+            season='fall' if i % 2 else 'spring',
+            division='U8' if i < 25 else 'U10',
+            order_number=f'ORD{i}',
+            order_date=datetime(2024, 1, 2),
+            confirmation_sent=i % 5 == 0,
+        ))
+    db_session.add(Player(full_name='No Registration', parent_email='none@example.com'))
+    db_session.commit()
+
+
+def read_csv(content):
+    return list(csv.DictReader(io.StringIO(content.decode())))
+
+
+def test_export_includes_registration_columns(client, roster, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 256)
+    response = client.get('/export')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+
+    rows = read_csv(response.content)
+    assert len(rows) == 51
+    assert rows[0] == {
+        'Name': 'Player 0',
+        'Parent Email': 'p0@example.com',
+        'Jersey Number': '1',
+        'Program': 'Spring Basketball',
+        'Sport': 'basketball',
+        'Season': 'spring',
+        'Division': 'U8',
+        'Order Number': 'ORD0',
+        'Order Date': '2024-01-02',
+        'Confirmation Sent': 'yes',
+    }
+    assert rows[-1]['Name'] == 'No Registration'
+    assert rows[-1]['Division'] == ''
+
+
+def test_export_filters(client, roster):
+    rows = read_csv(client.get('/export', params={'sport': 'Soccer', 'division': 'U10'}).content)
+    assert len(rows) == 13
+    assert {(r['Sport'], r['Division']) for r in rows} == {('soccer', 'U10')}
+
+    rows = read_csv(client.get('/export', params={'season': 'spring'}).content)
+    assert len(rows) == 25
+
+
+def test_export_gzip(client, roster):
+    response = client.get('/export', params={'gzip': 'true'})
+    assert response.headers['content-type'] == 'application/gzip'
+    assert 'players.csv.gz' in response.headers['content-disposition']
+    assert len(read_csv(gzip.decompress(response.content))) == 51
@@ -0,0 +1,110 @@
+import os
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.database import Base
+from app.models import Player, Registration
+from app.email import ingest_registrations
+from app.services.identity import CandidateIndex, match_key, resolve_players
+
+import pytest
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def registration(full_name, parent_email, sport='soccer', season='fall'):
+    return {
+        'full_name': full_name,
+        'program': f'{season} {sport}',
+        'division': 'U8',
+        'parent_email': parent_email,
+        'order_number': '1',
+        'order_date': datetime(2024, 8, 1),
+        'sport': sport,
+        'season': season,
+    }
+
+
+def test_match_key_normalises_case_and_spacing():
+    assert match_key('  Jordan   Smith ', 'Parent@Example.com ') == 'jordan smith|parent@example.com'
+    assert match_key('Jordan Smith', 'a@example.com') != match_key('Jordan Smith', 'b@example.com')
+
+
+def test_match_key_follows_player_edits(db_session):
+    player = Player(full_name='Jordan Smith', parent_email='a@example.com')
+    db_session.add(player)
+    db_session.commit()
+    assert player.match_key == 'jordan smith|a@example.com'
+
+    player.parent_email = 'new@example.com'
+    db_session.commit()
+    assert resolve_players(db_session, ['jordan smith|new@example.com'])['jordan smith|new@example.com'] is player
+
+
+def test_legacy_duplicate_keeps_its_suffix_on_unrelated_edits(db_session):
+    db_session.add(Player(full_name='Jordan Smith', parent_email='a@example.com'))
+    db_session.flush()
+    # What the match_key migration leaves behind for a pre-existing duplicate.
+    db_session.execute(
+        Player.__table__.insert().values(
+            id=2, full_name='jordan smith', parent_email='a@example.com', match_key='jordan smith|a@example.com#2'
+        )
+    )
+    db_session.commit()
+    legacy = db_session.get(Player, 2)
+
+    legacy.jersey_number = 7
+    db_session.commit()
+    assert legacy.match_key == 'jordan smith|a@example.com#2'
+
+    legacy.full_name = 'Jordan Smith Jr'
+    db_session.commit()
+    assert legacy.match_key == 'jordan smith jr|a@example.com'
+
+
+def test_put_player_reports_a_match_key_collision(async_client, session_factory):
+    db = session_factory()
+    db.add_all([Player(full_name='Amy Adams', parent_email='a@example.com'), Player(full_name='Ben Brown', parent_email='a@example.com')])
+    db.commit()
+    db.close()
+
+    update = {'full_name': 'AMY  adams', 'parent_email': 'a@example.com', 'jersey_number': 3}
+    assert async_client.put('/players/2', json=update).status_code == 409
+    assert async_client.put('/players/1', json=update).status_code == 200
+
+
+def test_ingest_resolves_players_by_match_key(db_session):
+    ingest_registrations([registration('Jordan Smith', 'smith@example.com')], db_session)
+    ingest_registrations([
+        registration('jordan  SMITH', 'Smith@example.com', sport='basketball', season='winter'),
+        registration('Jordan Smith', 'other.family@example.com'),
+    ], db_session)
+
+    players = db_session.query(Player).order_by(Player.id).all()
+    assert [p.parent_email for p in players] == ['smith@example.com', 'other.family@example.com']
+    assert db_session.query(Registration).filter_by(player_id=players[0].id).count() == 2
+    assert players[1].jersey_number == 2
+
+
+def test_candidate_index_reports_near_duplicates(db_session, capsys):
+    ingest_registrations([registration('Jordan Smith', 'smith@example.com')], db_session)
+    candidates = CandidateIndex.load(db_session)
+    assert candidates.near_duplicates('Smith Jordan', 'smith@example.com') == ['jordan smith|smith@example.com']
+    assert candidates.near_duplicates('Jamie Smith', 'smith@example.com') == []
+
+    ingest_registrations([registration('Jordan Smtih', 'smith@example.com')], db_session, candidates=candidates)
+    assert 'may be the same as jordan smith|smith@example.com' in capsys.readouterr().out
+    assert candidates.near_duplicates('Jordan Smith', 'dad@example.com') == ['jordan smith|smith@example.com']
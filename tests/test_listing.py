@@ -0,0 +1,140 @@
+import os
+from sqlalchemy import event
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import Player, Registration
+
+import pytest
+
+
+@pytest.fixture
+def roster(db_session):
+    # Names run backwards so name order differs from id order.
+    for i in range(12):
+        player = Player(
+            full_name=f'Player {11 - i:02d}',
+            parent_email='' if i % 4 == 0 else f'p{i}@example.com',
+            jersey_number=None if i % 3 == 0 else i + 1,
+        )
+        db_session.add(player)
+        db_session.flush()
+        db_session.add(Registration(
+            player_id=player.id,
+            program='Fall Soccer' if i % 2 else 'Spring Basketball',
+            division='U8' if i < 6 else 'U10',
+            sport='soccer' if i % 2 else 'basketball',
+            season='fall' if i % 2 else 'spring',
+            confirmation_sent=i % 5 == 0,
+        ))
+    db_session.commit()
+
+
+def walk(client, path, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        body = client.get(path, params={**params, **({'cursor': cursor} if cursor else {})}).json()
+        items += body['items']
+        pages += 1
+        cursor = body['next_cursor']
+        if not body['has_more']:
+            return items, pages
+
+
+def test_players_keyset_pages_cover_everything_once(client, roster):
+    items, pages = walk(client, '/players', limit=5)
+    assert [p['id'] for p in items] == list(range(1, 13))
+    assert pages == 3
+
+    by_name, _ = walk(client, '/players', limit=5, sort='full_name')
+    assert [p['full_name'] for p in by_name] == sorted(p['full_name'] for p in items)
+
+    newest, _ = walk(client, '/players', limit=5, sort='-id')
+    assert [p['id'] for p in newest] == list(range(12, 0, -1))
+
+
+def test_players_filters(client, roster):
+    soccer = client.get('/players', params={'sport': 'Soccer', 'division': 'U8'}).json()['items']
+    assert [p['id'] for p in soccer] == [2, 4, 6]
+
+    missing = client.get('/players', params={'missing_email': True, 'missing_jersey': True}).json()['items']
+    assert [p['id'] for p in missing] == [1]
+
+    confirmed = client.get('/players', params={'confirmation_sent': True}).json()['items']
+    assert [p['id'] for p in confirmed] == [1, 6, 11]
+
+
+def test_registrations_filters_sort_and_cursor(client, roster):
+    items, pages = walk(client, '/registrations', limit=2, season='fall', sort='-division')
+    assert len(items) == 6 and pages == 3
+    assert [r['division'] for r in items] == ['U8'] * 3 + ['U10'] * 3
+    assert all(r['sport'] == 'soccer' for r in items)
+    assert items[0]['full_name'] == 'Player 06'
+
+    unsent = client.get('/registrations', params={'confirmation_sent': False, 'limit': 500}).json()['items']
+    assert len(unsent) == 9
+
+
+def test_invalid_sort_and_cursor_are_rejected(client, roster):
+    assert client.get('/players', params={'sort': 'parent_email'}).status_code == 400
+    assert client.get('/players', params={'cursor': 'not-a-cursor'}).status_code == 400
+    cursor = client.get('/players', params={'limit': 1}).json()['next_cursor']
+    assert client.get('/players', params={'cursor': cursor, 'sort': 'full_name'}).status_code == 400
+
+
+def test_last_page_cursor_picks_up_new_rows(client, roster, db_session):
+    last = client.get('/registrations', params={'limit': 500}).json()
+    assert not last['has_more']
+    db_session.add(Registration(player_id=1, program='Fall Soccer', division='U8', sport='soccer', season='fall'))
+    db_session.commit()
+    new = client.get('/registrations', params={'cursor': last['next_cursor']}).json()
+    assert [r['id'] for r in new['items']] == [13]
+
+
+def test_filters_match_stored_values_like_the_other_endpoints(client, db_session):
+    amy = Player(full_name='Amy Adams', parent_email='amy@example.com', jersey_number=0)
+    ben = Player(full_name='Ben Brown', parent_email='ben@example.com', jersey_number=5)
+    db_session.add_all([amy, ben])
+    db_session.flush()
+    db_session.add_all([
+        Registration(player_id=amy.id, program='Fall 2025 Soccer', division='U8', sport=' Soccer', season='Fall 2025',
+                     confirmation_sent=None),
+        Registration(player_id=ben.id, program='Fall 2025 Soccer', division='U8', sport='soccer', season='Fall 2025',
+                     confirmation_sent=True),
+    ])
+    db_session.commit()
+
+    params = {'season': 'Fall 2025', 'sport': 'SOCCER'}
+    assert len(client.get('/registrations', params=params).json()['items']) == 2
+    assert len(client.get('/export', params=params).text.strip().splitlines()) == 3
+
+    unsent = client.get('/registrations', params={**params, 'confirmation_sent': False}).json()['items']
+    assert [r['full_name'] for r in unsent] == ['Amy Adams']
+    missing = client.get('/players', params={'missing_jersey': True}).json()['items']
+    assert [p['full_name'] for p in missing] == ['Amy Adams']
+
+
+def test_empty_poll_page_keeps_the_cursor(client, roster):
+    last = client.get('/registrations', params={'limit': 500}).json()
+    empty = client.get('/registrations', params={'cursor': last['next_cursor']}).json()
+    assert empty['items'] == [] and not empty['has_more']
+    assert empty['next_cursor'] == last['next_cursor']
+
+
+def test_sport_filter_uses_the_sport_key_index(client, engine, roster):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM registrations' in statement and 'lower(trim(' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        client.get('/registrations', params={'sport': 'Soccer', 'season': 'fall'})
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    statement, parameters = statements[-1]
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    assert any('ix_registrations_sport_key_season_division_id' in row[-1] for row in plan)
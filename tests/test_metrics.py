@@ -0,0 +1,78 @@
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.database import Base
+from app.models import Player, Registration
+from app.auth import create_user
+from app.main import app, get_db
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    engine = create_engine(
+        'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    db = Session()
+    create_user(db, 'admin@example.com', 'admin')
+    for i in range(3):
+        player = Player(full_name=f'Player {i}', parent_email=f'p{i}@example.com', jersey_number=i + 1)
+        db.add(player)
+        db.flush()
+        db.add(Registration(player_id=player.id, program='Fall Soccer', division='U8', sport='soccer', season='fall'))
+    db.commit()
+    db.close()
+    client = TestClient(app)
+    client.post('/login', data={'email': 'admin@example.com', 'password': 'admin'}, follow_redirects=False)
+    yield client
+    app.dependency_overrides.clear()
+
+
+def test_query_count_header_is_opt_in(client, monkeypatch):
+    assert 'x-query-count' not in client.get('/admin').headers
+
+    monkeypatch.setattr(metrics, 'QUERY_COUNT_HEADER', True)
+    response = client.get('/admin')
+    assert response.status_code == 200
+    assert int(response.headers['x-query-count']) == 3
+    assert float(response.headers['x-db-time-ms']) > 0
+    assert client.get('/').headers['x-query-count'] == '0'
+
+
+def test_metrics_reports_per_route_latency_and_queries(client):
+    client.get('/admin/roster/soccer/U8')
+    client.get('/admin/roster/soccer/U8')
+    client.get('/no-such-page')
+
+    body = client.get('/metrics').text
+    route = 'method="GET",route="/admin/roster/{sport}/{division:path}"'
+    assert f'http_requests_total{{{route},status="200"}}' in body
+    assert f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in body
+    # The data version check plus one query per roster render.
+    assert f'http_request_db_queries_bucket{{{route},le="2"}}' in body
+    counts = {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in body.splitlines() if not line.startswith('#')
+    }
+    assert counts[f'http_request_db_queries_bucket{{{route},le="2"}}'] == counts[f'http_request_db_queries_count{{{route}}}']
+    assert 'route="unmatched",status="404"' in body
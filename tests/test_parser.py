@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from app.services.parser import MissingFields, RegistrantParser, classify_program
+
+import pytest
+
+
+def test_classify_program_uses_fixed_priorities():
+    assert classify_program('Fall 2024 Soccer') == ('soccer', 'fall')
+    assert classify_program('Spring Fall Flag Soccer') == ('soccer', 'fall')
+    assert classify_program('Winter Basketball') == ('basketball', 'winter')
+    assert classify_program('Open Gym') == ('unknown', 'unknown')
+
+
+def test_parse_block_extracts_all_fields():
+    block = (
+        'Name: Jordan Smith\n'
+        'Program: Fall Soccer\n'
+        'Division: U10\n'
+        'Parent Email: parent@example.com\n'
+        'Order Number: 42\n'
+        'Order Date: January 1, 2024'
+    )
+    assert RegistrantParser().parse_block(block) == {
+        'full_name': 'Jordan Smith',
+        'program': 'Fall Soccer',
+        'division': 'U10',
+        'parent_email': 'parent@example.com',
+        'order_number': '42',
+        'order_date': datetime(2024, 1, 1),
+        'sport': 'soccer',
+        'season': 'fall',
+    }
+
+
+def test_parse_block_reports_missing_fields():
+    with pytest.raises(MissingFields) as exc:
+        RegistrantParser().parse_block('Program: Fall Soccer\nDivision: U8')
+    assert exc.value.missing == ['Name', 'Parent Email']
@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Player, Registration
+from app.services.archive import EmailArchive
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'replay_inbound_emails.py')
+
+
+def make_email(n, name, division='U8', order_number=None):
+    return (
+        f"Message-ID: <msg-{n}@example.com>\n"
+        "Subject: Registration\n\n"
+        f"Order Number: {order_number or 1000 + n}\n"
+        f"Name: {name}\nProgram: Fall 2024 Soccer\nDivision: {division}\n"
+        f"Parent Email: {name.split()[0].lower()}@example.com\n"
+    )
+
+
+@pytest.fixture
+def replay(engine, monkeypatch):
+    spec = importlib.util.spec_from_file_location('replay_inbound_emails', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so the worker processes can unpickle the parse function.
+    monkeypatch.setitem(sys.modules, spec.name, module)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, 'SessionLocal', sessionmaker(bind=engine))
+    return module
+
+
+@pytest.fixture
+def archive_dir(tmp_path, db_session):
+    amy = Player(full_name='Amy Adams', parent_email='amy@example.com', jersey_number=4)
+    db_session.add(amy)
+    db_session.flush()
+    db_session.add(Registration(
+        player_id=amy.id, program='Fall 2024 Soccer', division='U8', sport='soccer', season='fall',
+        order_number='1001',
+    ))
+    db_session.commit()
+
+    archive = EmailArchive(str(tmp_path))
+    archive.append(make_email(1, 'Amy Adams', division='U10', order_number=1001), datetime(2024, 8, 1))
+    archive.append(make_email(2, 'Ben Brown'), datetime(2024, 8, 2))
+    archive.append(make_email(3, 'Ben Brown', division='U10'), datetime(2024, 8, 3))
+    archive.append(make_email(4, 'Cal Cole'), datetime(2024, 8, 4))
+    return str(tmp_path)
+
+
+def test_dry_run_prints_the_diff_and_writes_nothing(replay, archive_dir, db_session, capsys):
+    args = ['--archive', archive_dir, '--workers', '1', '--chunk-size', '1', '--batch-size', '2', '--dry-run']
+    assert replay.main(args) == 0
+
+    assert capsys.readouterr().out.splitlines() == [
+        "#1 ~ registration Amy Adams soccer fall division: 'U8' -> 'U10'",
+        "#2 + player Ben Brown <ben@example.com>",
+        "#2 + registration Ben Brown soccer fall U8",
+        "#3 ~ registration Ben Brown soccer fall division: 'U8' -> 'U10'",
+        "#3 ~ registration Ben Brown soccer fall order_number: '1002' -> '1003'",
+        "#4 + player Cal Cole <cal@example.com>",
+        "#4 + registration Cal Cole soccer fall U8",
+    ]
+    assert db_session.query(Player).count() == 1
+    assert db_session.query(Registration).one().division == 'U8'
+
+
+def test_replay_writes_in_arrival_order(replay, archive_dir, db_session):
+    args = ['--archive', archive_dir, '--workers', '1', '--chunk-size', '1', '--batch-size', '2']
+    assert replay.main(args) == 0
+
+    db_session.expire_all()
+    rows = (
+        db_session.query(Player.full_name, Registration.division, Registration.order_number)
+        .join(Registration)
+        .order_by(Player.full_name)
+        .all()
+    )
+    assert rows == [('Amy Adams', 'U10', '1001'), ('Ben Brown', 'U10', '1003'), ('Cal Cole', 'U8', '1004')]
+
+
+def test_since_and_until_limit_the_replay(replay, archive_dir, db_session):
+    args = [
+        '--archive', archive_dir, '--workers', '1',
+        '--since', '2024-08-02', '--until', '2024-08-03',
+    ]
+    assert replay.main(args) == 0
+
+    db_session.expire_all()
+    assert [p.full_name for p in db_session.query(Player).order_by(Player.id)] == ['Amy Adams', 'Ben Brown']
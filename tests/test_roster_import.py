@@ -0,0 +1,78 @@
+import io
+import os
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import JerseyAllocation, Player, Registration
+from app.services.roster_import import import_roster
+
+
+def roster_csv(*rows, header='Name,Parent Email,Program,Division,Sport,Season'):
+    return io.BytesIO(('\n'.join([header, *rows]) + '\n').encode())
+
+
+def test_import_creates_players_registrations_and_numbers(db_session):
+    existing = Player(full_name='Old Timer', parent_email='old@example.com', jersey_number=1)
+    db_session.add(existing)
+    db_session.flush()
+    db_session.add(Registration(player_id=existing.id, program='Fall Soccer', division='U8', sport='soccer', season='fall'))
+    db_session.commit()
+
+    report = import_roster(roster_csv(
+        'Amy Adams,amy@example.com,Fall 2024 Soccer,U8,soccer,fall',
+        'Ben Brown,ben@example.com,,U8,Soccer,Fall',
+        'Cal Cole,cal@example.com,Spring Basketball,U10,,',
+        'Old Timer,old@example.com,Spring Soccer,U8,soccer,spring',
+    ), db_session, batch_size=2)
+
+    assert report['errors'] == []
+    assert report['imported'] == 4
+    assert report['new_players'] == 3
+    numbers = dict(db_session.query(Player.full_name, Player.jersey_number))
+    assert numbers == {'Old Timer': 1, 'Amy Adams': 2, 'Ben Brown': 3, 'Cal Cole': 1}
+    cal = db_session.query(Registration).join(Player).filter(Player.full_name == 'Cal Cole').one()
+    assert (cal.sport, cal.season, cal.division) == ('basketball', 'spring', 'U10')
+    ben = db_session.query(Registration).join(Player).filter(Player.full_name == 'Ben Brown').one()
+    assert ben.program == 'fall soccer'
+    assert db_session.query(JerseyAllocation).count() == 3
+
+
+def test_import_reports_invalid_rows_and_keeps_the_rest(db_session):
+    report = import_roster(roster_csv(
+        'Amy Adams,amy@example.com,,U8,soccer,fall',
+        ',nobody@example.com,,U8,soccer,fall',
+        'Ben Brown,not-an-email,,U8,soccer,fall',
+        'Cal Cole,cal@example.com,Mystery Program,U8,,',
+        'Amy Adams,amy@example.com,,U8,soccer,fall',
+    ), db_session, batch_size=2)
+
+    assert report['imported'] == 1
+    errors = {error['line']: error['errors'] for error in report['errors']}
+    assert errors[3] == ['full_name is required']
+    assert errors[4] == ["invalid parent email 'not-an-email'"]
+    assert errors[5] == ['sport is required', 'season is required']
+    assert errors[6] == ['duplicate of line 2']
+    assert db_session.query(Player).count() == 1
+
+
+def test_import_endpoint(client, db_session):
+    response = client.post(
+        '/roster/import',
+        files={'file': ('roster.csv', roster_csv('Amy Adams,amy@example.com,,U8,soccer,fall').getvalue(), 'text/csv')},
+    )
+    assert response.status_code == 200
+    assert response.json()['imported'] == 1
+    assert db_session.query(Registration).count() == 1
+
+    again = client.post(
+        '/roster/import',
+        files={'file': ('roster.csv', roster_csv('Amy Adams,amy@example.com,,U8,soccer,fall').getvalue(), 'text/csv')},
+    )
+    assert again.json()['errors'][0]['errors'] == ['already registered for soccer fall']
+
+    bad = client.post(
+        '/roster/import',
+        files={'file': ('roster.csv', roster_csv('Amy', header='Name').getvalue(), 'text/csv')},
+    )
+    assert bad.status_code == 400
@@ -0,0 +1,98 @@
+import os
+from sqlalchemy import create_mock_engine
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.database import Base
+from app.models import Player
+from app.services import search
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    search.reset_index()
+    yield
+    search.reset_index()
+
+
+def add_player(db, full_name, parent_email):
+    player = Player(full_name=full_name, parent_email=parent_email)
+    db.add(player)
+    db.commit()
+    return player
+
+
+def test_search_ranks_name_and_email_matches(db_session):
+    add_player(db_session, 'Jordan Smith', 'smith@example.com')
+    add_player(db_session, 'Jordyn Smithers', 'js@example.com')
+    add_player(db_session, 'Taylor Brown', 'jordan.family@example.com')
+    add_player(db_session, 'Riley Lee', 'lee@example.com')
+
+    results, has_more = search.search_players(db_session, 'jordan smith')
+    assert [p.full_name for p, _ in results] == ['Jordan Smith', 'Jordyn Smithers']
+    assert results[0][1] == 1.0 > results[1][1]
+    assert not has_more
+
+    names = [p.full_name for p, _ in search.search_players(db_session, 'jordan')[0]]
+    assert names == ['Jordan Smith', 'Taylor Brown']
+
+    assert search.search_players(db_session, 'zzz') == ([], False)
+
+
+def test_index_follows_commits_and_ignores_rollbacks(db_session):
+    player = add_player(db_session, 'Jordan Smith', 'smith@example.com')
+    assert search.search_players(db_session, 'jordan')[0]
+
+    player.full_name = 'Morgan Davis'
+    db_session.commit()
+    assert search.search_players(db_session, 'jordan')[0] == []
+    assert search.search_players(db_session, 'morgan')[0][0][0].id == player.id
+
+    db_session.add(Player(full_name='Casey Jones', parent_email='jones@example.com'))
+    db_session.flush()
+    db_session.rollback()
+    assert search.search_players(db_session, 'casey')[0] == []
+
+    db_session.delete(player)
+    db_session.commit()
+    assert search.search_players(db_session, 'morgan')[0] == []
+    assert len(search.get_index(db_session)) == 0
+
+
+def test_search_endpoint_paginates(client, db_session):
+    for i in range(5):
+        add_player(db_session, f'Alex Player{i}', f'alex{i}@example.com')
+
+    first = client.get('/players/search', params={'q': 'alex', 'limit': 3}).json()
+    assert len(first['results']) == 3
+    assert first['next_offset'] == 3
+    second = client.get('/players/search', params={'q': 'alex', 'limit': 3, 'offset': 3}).json()
+    assert len(second['results']) == 2
+    assert second['next_offset'] is None
+    ids = [r['id'] for r in first['results'] + second['results']]
+    assert len(set(ids)) == 5
+
+    imported = client.post(
+        '/roster/import',
+        files={'file': ('roster.csv', b'Name,Parent Email,Division,Sport,Season\nAlex New,new@example.com,U8,soccer,fall\n')},
+    )
+    assert imported.status_code == 200
+    names = [r['full_name'] for r in client.get('/players/search', params={'q': 'alex new'}).json()['results']]
+    assert names[0] == 'Alex New'
+
+
+def test_init_db_creates_the_trigram_schema_on_postgres():
+    statements = []
+    engine = create_mock_engine(
+        'postgresql://', lambda sql, *args, **kwargs: statements.append(str(sql.compile(dialect=engine.dialect)))
+    )
+    Base.metadata.create_all(engine, checkfirst=False)
+    ddl = [' '.join(s.split()) for s in statements]
+    assert ddl.index('CREATE EXTENSION IF NOT EXISTS pg_trgm') < next(
+        i for i, s in enumerate(ddl) if s.startswith('CREATE TABLE players ')
+    )
+    assert 'CREATE INDEX ix_players_full_name_trgm ON players USING gin (full_name gin_trgm_ops)' in ddl
+    assert 'CREATE INDEX ix_players_parent_email_trgm ON players USING gin (parent_email gin_trgm_ops)' in ddl
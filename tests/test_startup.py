@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, **env):
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        env={**os.environ, 'DATABASE_URL': 'sqlite:///:memory:', **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_importing_the_app_is_quiet_and_skips_heavy_modules():
+    result = run(
+        "import sys, app.main\n"
+        "from app import startup\n"
+        "print(sorted(m for m in ('sendgrid', 'bs4', 'httpx', 'passlib') if m in sys.modules))\n"
+        "print(sorted(startup.phases))\n"
+    )
+    assert result.stdout.splitlines() == ["[]", "['import app', 'import framework']"]
+
+
+def test_schema_is_created_by_init_db_not_by_import(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    run("import app.main", DATABASE_URL=url)
+    assert not (tmp_path / 'app.db').exists()
+
+    result = run("from app.manage import main; main(['init-db'])", DATABASE_URL=url)
+    assert 'Created admin user admin@example.com' in result.stdout
+    check = run(
+        "from app.database import SessionLocal\n"
+        "from app.models import User\n"
+        "print(SessionLocal().query(User).count())\n",
+        DATABASE_URL=url,
+    )
+    assert check.stdout.strip() == '1'
@@ -0,0 +1,136 @@
+import io
+import os
+import subprocess
+import sys
+from datetime import datetime
+from sqlalchemy import event
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import Player, Registration, RosterCounter, RosterSummary
+from app.email import ingest_registrations
+from app.services import summary
+from app.services.roster_import import import_roster
+
+
+def snapshot(db):
+    db.expire_all()
+    counters = {name: value for name, value in db.query(RosterCounter.name, RosterCounter.value) if value}
+    rows = {
+        (row.sport, row.season, row.division): row.registrations
+        for row in db.query(RosterSummary)
+        if row.registrations
+    }
+    return counters, rows
+
+
+def assert_matches_rebuild(db):
+    incremental = snapshot(db)
+    summary.rebuild(db)
+    assert snapshot(db) == incremental
+    return incremental
+
+
+def test_write_paths_keep_summary_in_step(client, db_session):
+    client.post('/players/new', data={
+        'full_name': 'Amy Adams', 'parent_email': 'amy@example.com', 'sport': 'Soccer', 'division': 'U8', 'season': 'fall',
+    }, follow_redirects=False)
+    client.post('/players/inline', json={
+        'full_name': 'Ben Brown', 'parent_email': '', 'sport': 'soccer', 'division': 'U10', 'season': 'fall',
+    })
+    ingest_registrations([{
+        'full_name': 'Cal Cole', 'program': 'Fall Soccer', 'division': 'U8', 'parent_email': 'cal@example.com',
+        'order_number': '1', 'order_date': datetime(2024, 8, 1), 'sport': 'soccer', 'season': 'fall',
+    }], db_session)
+    import_roster(io.BytesIO(b'Name,Parent Email,Division,Sport,Season\nDee Dunn,dee@example.com,U8,basketball,winter\n'), db_session)
+
+    counters, rows = assert_matches_rebuild(db_session)
+    assert counters == {'players': 4, 'missing_emails': 1}
+    assert rows == {('soccer', 'fall', 'U8'): 2, ('soccer', 'fall', 'U10'): 1, ('basketball', 'winter', 'U8'): 1}
+
+    ben = db_session.query(Player).filter_by(full_name='Ben Brown').one()
+    db_session.expire(ben)
+    ben.jersey_number = None
+    ben.parent_email = 'ben@example.com'
+    reg = db_session.query(Registration).filter_by(player_id=ben.id).one()
+    reg.division = 'U8'
+    db_session.commit()
+    counters, rows = assert_matches_rebuild(db_session)
+    assert counters == {'players': 4, 'missing_jerseys': 1}
+    assert rows == {('soccer', 'fall', 'U8'): 3, ('basketball', 'winter', 'U8'): 1}
+
+    assert client.delete(f'/players/{ben.id}').status_code == 200
+    counters, rows = assert_matches_rebuild(db_session)
+    assert counters == {'players': 3}
+    assert rows == {('soccer', 'fall', 'U8'): 2, ('basketball', 'winter', 'U8'): 1}
+
+
+def test_rolled_back_writes_leave_summary_alone(db_session):
+    db_session.add(Player(full_name='Amy Adams', parent_email=''))
+    db_session.flush()
+    db_session.rollback()
+    assert snapshot(db_session) == ({}, {})
+
+
+def test_counters_are_written_once_at_commit(db_session, engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'roster_counters' in statement:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for name in ('Amy Adams', 'Ben Brown', 'Cal Cole'):
+            db_session.add(Player(full_name=name, parent_email=''))
+            db_session.flush()
+        assert statements == []
+        db_session.commit()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    # One upsert per counter, however many flushes there were.
+    assert len(statements) == 3
+    assert snapshot(db_session)[0] == {'players': 3, 'missing_emails': 3, 'missing_jerseys': 3}
+
+
+def test_savepoints_keep_or_drop_their_deltas(db_session):
+    db_session.add(Player(full_name='Amy Adams', parent_email='amy@example.com'))
+    db_session.flush()
+    with db_session.begin_nested():
+        db_session.add(Player(full_name='Ben Brown', parent_email='ben@example.com'))
+    savepoint = db_session.begin_nested()
+    db_session.add(Player(full_name='Cal Cole', parent_email='cal@example.com'))
+    db_session.flush()
+    savepoint.rollback()
+    db_session.commit()
+    assert assert_matches_rebuild(db_session)[0] == {'players': 2, 'missing_jerseys': 2}
+
+
+def test_dashboard_reads_the_summary(client, db_session):
+    db_session.add(RosterCounter(name='players', value=1234))
+    db_session.add(RosterSummary(sport='soccer', season='fall', division='U12', registrations=5))
+    db_session.add(RosterSummary(sport='soccer', season='fall', division='U6', registrations=0))
+    db_session.commit()
+
+    response = client.get('/admin')
+    assert response.context['total_players'] == 1234
+    assert response.context['missing_emails'] == 0
+    assert response.context['divisions_by_sport'] == {'soccer': ['U12']}
+
+
+def test_models_alone_keep_the_summary_current(tmp_path):
+    # A writer that imports nothing but the models (a one-off script, say).
+    code = (
+        "from app.database import Base, SessionLocal, engine\n"
+        "from app.models import Player, RosterCounter\n"
+        "Base.metadata.create_all(engine)\n"
+        "db = SessionLocal()\n"
+        "db.add(Player(full_name='Amy Adams', parent_email=''))\n"
+        "db.commit()\n"
+        "print(sorted(db.query(RosterCounter.name, RosterCounter.value).all()))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'app.db'}"}
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[('missing_emails', 1), ('missing_jerseys', 1), ('players', 1)]"
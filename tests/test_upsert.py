@@ -0,0 +1,41 @@
+import os
+
+# Ensure database URL is set before importing application modules
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app.models import DataVersion, JerseyAllocation, RosterCounter
+from app.services import upsert as upsert_module
+from app.services.data_version import bump
+from app.services.upsert import upsert
+
+import pytest
+
+
+@pytest.fixture(params=['on_conflict', 'fallback'])
+def connection(request, db_session, monkeypatch):
+    if request.param == 'fallback':
+        # What databases without INSERT ... ON CONFLICT go through.
+        monkeypatch.setattr(upsert_module, '_dialect_insert', lambda connection: None)
+    return db_session.connection()
+
+
+def test_upsert_inserts_then_updates(connection):
+    for delta in (2, 3):
+        assert upsert(connection, RosterCounter, {'name': 'players', 'value': delta}, ['name'],
+                      {'value': RosterCounter.value + delta})
+    assert connection.execute(RosterCounter.__table__.select()).all() == [('players', 5)]
+
+
+def test_upsert_without_set_skips_conflicts(connection):
+    values = {'division': 'U8', 'season': 'fall', 'number': 7}
+    keys = ['division', 'season', 'number']
+    assert upsert(connection, JerseyAllocation, values, keys) is True
+    assert upsert(connection, JerseyAllocation, values, keys) is False
+    assert upsert(connection, JerseyAllocation, {**values, 'number': 8}, keys) is True
+    assert [row.number for row in connection.execute(JerseyAllocation.__table__.select())] == [7, 8]
+
+
+def test_bump_counts_up(connection):
+    bump(connection)
+    bump(connection)
+    assert connection.execute(DataVersion.__table__.select()).one().version == 2